@@ -0,0 +1,110 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+
+
+def conditional_get(validator_func):
+    """
+    Answer ``If-None-Match`` on an APIView ``get`` before the view body runs.
+
+    ``validator_func(view, request, *args, **kwargs)`` must return a cheap
+    value that changes whenever the response would, e.g. version counters or
+    the newest ``(created_at, id)``, or None to skip the check. It is hashed
+    together with the user and query string into a weak ETag, so a matching
+    request gets a 304 without any queries for or serialization of the body.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            validator = validator_func(self, request, *args, **kwargs)
+            if validator is None:
+                return view_method(self, request, *args, **kwargs)
+            raw = repr((request.user.pk, request.get_full_path(), validator)).encode()
+            etag = f'W/"{hashlib.md5(raw, usedforsecurity=False).hexdigest()}"'
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    response["ETag"] = etag
+            # Bodies are per user, so shared caches must not reuse them.
+            patch_vary_headers(response, ["Authorization"])
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def state_version(key):
+    """
+    Counter in the default cache for changes a cheap validator cannot see.
+
+    It starts from the clock, so a counter lost with the cache comes back
+    larger than any value it had before. Without SHARED_CACHE each worker
+    would count on its own, so this returns None and validators that need a
+    counter skip the check.
+    """
+    if not getattr(settings, "SHARED_CACHE", False):
+        return None
+    return cache.get_or_set(key, time.time_ns, timeout=None)
+
+
+def bump_state_version(key):
+    if not getattr(settings, "SHARED_CACHE", False):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def read_state_key(scope, user_id):
+    return f"read_state:{scope}:{user_id}"
+
+
+def bump_read_state(scope, *user_ids):
+    """
+    Invalidate the ``scope`` lists of ``user_ids``, now and again at commit
+    so a list read before the commit is not cached under the new version.
+    """
+
+    def bump():
+        for user_id in user_ids:
+            bump_state_version(read_state_key(scope, user_id))
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def read_state_validator(view, request, *args, **kwargs):
+    """
+    Validator for list views over models with an ``is_read`` flag.
+
+    Inserts move the newest id of ``view.get_queryset()``; read-state updates
+    and deletes call ``bump_read_state(view.read_state_scope, user_id)``. The
+    user cards shown for ``view.card_user_fields`` count through the sum of
+    their ``card_version``, which every card change increments.
+    """
+    version = state_version(read_state_key(view.read_state_scope, request.user.pk))
+    if version is None:
+        return None
+    state = view.get_queryset().aggregate(
+        newest=Max("id"),
+        **{
+            f"{field}_cards": Sum(f"{field}__card_version")
+            for field in view.card_user_fields
+        },
+    )
+    return sorted(state.items()), version
@@ -0,0 +1,170 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import Q
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+from rest_framework.exceptions import AuthenticationFailed
+
+from media_utils import get_media_storage
+from users.authentication import CachedJWTAuthentication
+
+# Attachments under these prefixes are only visible to the two participants.
+PRIVATE_MEDIA_PREFIXES = ("messages/",)
+PUBLIC_MAX_AGE = 86400
+PRIVATE_MAX_AGE = 3600
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _authenticated_user(request):
+    if request.user.is_authenticated:
+        return request.user
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def _can_view_private_media(request, path):
+    from messages.models import Message
+
+    user = _authenticated_user(request)
+    if user is None:
+        return False
+    # The same file may be attached to several messages; any of them counts.
+    return (
+        Message.objects.filter(Q(image=path) | Q(video=path))
+        .filter(Q(sender=user) | Q(recipient=user))
+        .exists()
+    )
+
+
+def _parse_range(header, size):
+    """Return ``(start, end)`` for a single byte range, or None to serve it all."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def _iter_file_range(path, start, length):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _offload_response(path, full_path, content_type):
+    backend = getattr(settings, "MEDIA_ACCEL_BACKEND", "")
+    if backend == "nginx":
+        prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/")
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = f"{prefix}/{path}"
+        return response
+    if backend == "sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = full_path
+        return response
+    return None
+
+
+def _local_response(request, full_path, size, etag, content_type):
+    range_header = request.headers.get("Range")
+    if_range = request.headers.get("If-Range")
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _iter_file_range(full_path, start, length),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(length)
+            return response
+    return FileResponse(open(full_path, "rb"), content_type=content_type)
+
+
+@require_safe
+def serve_media(request, path):
+    storage = get_media_storage()
+    try:
+        full_path = safe_join(storage.location, path)
+    except SuspiciousFileOperation:
+        raise Http404("Media not found.")
+    if not os.path.isfile(full_path):
+        raise Http404("Media not found.")
+
+    private = path.startswith(PRIVATE_MEDIA_PREFIXES)
+    if private and not _can_view_private_media(request, path):
+        raise Http404("Media not found.")
+
+    stat = os.stat(full_path)
+    etag = quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+    last_modified = int(stat.st_mtime)
+    cache_control = (
+        f"private, max-age={PRIVATE_MAX_AGE}"
+        if private
+        else f"public, max-age={PUBLIC_MAX_AGE}"
+    )
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        if isinstance(not_modified, HttpResponseNotModified):
+            not_modified["Cache-Control"] = cache_control
+        return not_modified
+
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+
+    # The front-end server takes care of ranges and the byte transfer itself.
+    response = _offload_response(path, full_path, content_type)
+    if response is None:
+        response = _local_response(request, full_path, stat.st_size, etag, content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = cache_control
+    response["Accept-Ranges"] = "bytes"
+    return response
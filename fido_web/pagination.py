@@ -0,0 +1,101 @@
+import base64
+import binascii
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over ``(ordering_field, id)``.
+
+    Each page is a single range scan starting right after the last row of the
+    previous page, so deep pages cost the same as the first one. Subclasses or
+    views set ``ordering_field`` (a datetime column) and ``descending``.
+    """
+
+    ordering_field = "created_at"
+    descending = True
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self, ordering_field=None, descending=None, page_size=None):
+        if ordering_field is not None:
+            self.ordering_field = ordering_field
+        if descending is not None:
+            self.descending = descending
+        if page_size is not None:
+            self.page_size = page_size
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, instance):
+        value = getattr(instance, self.ordering_field)
+        raw = f"{value.isoformat()}|{instance.pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            position = parse_datetime(value)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if position is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        field = self.ordering_field
+        lookup = "lt" if self.descending else "gt"
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            position, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f"{field}__{lookup}": position})
+                | Q(**{field: position, f"id__{lookup}": pk})
+            )
+        prefix = "-" if self.descending else ""
+        queryset = queryset.order_by(f"{prefix}{field}", f"{prefix}id")
+
+        page_size = self.get_page_size(request)
+        page = list(queryset[: page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.next_cursor = self.encode_cursor(page[-1]) if self.has_next else None
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
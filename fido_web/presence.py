@@ -0,0 +1,117 @@
+"""
+Who has a realtime socket open right now.
+
+Every consumer connection adds one to ``presence:<user_id>`` in the default
+cache and keeps the key alive with a heartbeat every HEARTBEAT_INTERVAL
+seconds; disconnect takes the one off again. A process that dies without
+disconnecting leaves its count behind only until PRESENCE_TTL passes without
+a heartbeat. The request path asks ``has_listeners`` (one ``get_many``)
+before publishing and skips the channel layer when nobody is listening.
+
+Skipping needs a cache every worker shares, so it is off unless
+PRESENCE_SKIP_OFFLINE is set (settings turn it on with REDIS_CACHE_URL). If
+the cache fails, everybody counts as online so no event is dropped.
+"""
+
+import asyncio
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_TTL = 90
+HEARTBEAT_INTERVAL = 30
+
+
+def presence_key(user_id):
+    return f"presence:{user_id}"
+
+
+def online_user_ids(user_ids):
+    """Return the subset of ``user_ids`` with at least one open socket."""
+    keys = {presence_key(user_id): user_id for user_id in user_ids}
+    try:
+        counts = cache.get_many(keys)
+    except Exception:
+        logger.warning("Presence cache unavailable, treating users as online")
+        return set(keys.values())
+    return {keys[key] for key, count in counts.items() if count > 0}
+
+
+def has_listeners(user_ids):
+    """False only when none of ``user_ids`` can receive a realtime event."""
+    if not getattr(settings, "PRESENCE_SKIP_OFFLINE", False):
+        return True
+    return bool(online_user_ids(user_ids))
+
+
+async def connect(user_id):
+    key = presence_key(user_id)
+    await cache.aadd(key, 0, PRESENCE_TTL)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        # Expired between the two calls.
+        await cache.aset(key, 1, PRESENCE_TTL)
+    await cache.atouch(key, PRESENCE_TTL)
+
+
+async def heartbeat(user_id):
+    if not await cache.atouch(presence_key(user_id), PRESENCE_TTL):
+        # Lost to a cache restart or eviction; count this socket again, added
+        # to whatever the user's other sockets have re-registered meanwhile.
+        await connect(user_id)
+
+
+async def disconnect(user_id):
+    key = presence_key(user_id)
+    try:
+        if await cache.adecr(key) <= 0:
+            await cache.adelete(key)
+    except ValueError:
+        pass
+
+
+class PresenceMixin:
+    """
+    Consumer mixin: ``await self.join_presence(user_id)`` right after
+    ``group_add``, before any replay query, so nothing published meanwhile is
+    skipped as offline; ``await self.leave_presence()`` on disconnect.
+    """
+
+    presence_user_id = None
+    presence_task = None
+
+    async def join_presence(self, user_id):
+        try:
+            await connect(user_id)
+        except Exception:
+            logger.warning(
+                "Presence cache unavailable, user %s not registered", user_id
+            )
+            return
+        self.presence_user_id = user_id
+        self.presence_task = asyncio.ensure_future(self.presence_heartbeat())
+
+    async def presence_heartbeat(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                await heartbeat(self.presence_user_id)
+            except Exception:
+                logger.warning("Presence heartbeat failed")
+
+    async def leave_presence(self):
+        if self.presence_user_id is None:
+            return
+        self.presence_task.cancel()
+        try:
+            await disconnect(self.presence_user_id)
+        except Exception:
+            logger.warning(
+                "Presence cache unavailable, user %s not removed",
+                self.presence_user_id,
+            )
+        self.presence_user_id = None
@@ -149,6 +149,34 @@ else:
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Hand LocalMediaStorage file transfers to the front-end server:
+# "nginx" (X-Accel-Redirect), "sendfile" (X-Sendfile) or "" to serve from Django.
+MEDIA_ACCEL_BACKEND = os.environ.get("MEDIA_ACCEL_BACKEND", "")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.environ.get(
+    "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/"
+)
+
+# Cache shared by all workers (user cards, rate limits). Falls back to a
+# per-process cache when REDIS_CACHE_URL is not configured.
+if os.environ.get("REDIS_CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_CACHE_URL"],
+        }
+    }
+    # Realtime publishes skip users with no open socket (fido_web.presence).
+    PRESENCE_SKIP_OFFLINE = True
+    # User cards and ETag state versions may live in the cache (users.cards,
+    # fido_web.conditional); per-process copies would disagree between workers.
+    SHARED_CACHE = True
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -157,13 +185,21 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "users.CustomUser"
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ),
+    "DEFAULT_AUTHENTICATION_CLASSES": ("users.authentication.CachedJWTAuthentication",),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "EXCEPTION_HANDLER": "fido_web.exception_handler.custom_exception_handler",
+    "DEFAULT_THROTTLE_RATES": {
+        "login_ip": os.environ.get("THROTTLE_LOGIN_IP", "30/min"),
+        "login_identifier": os.environ.get("THROTTLE_LOGIN_IDENTIFIER", "5/min"),
+        "register_ip": os.environ.get("THROTTLE_REGISTER_IP", "20/hour"),
+        "register_identifier": os.environ.get("THROTTLE_REGISTER_IDENTIFIER", "3/hour"),
+        "availability_ip": os.environ.get("THROTTLE_AVAILABILITY_IP", "120/min"),
+    },
 }
 
+# Seconds a process may reuse a user resolved from a JWT; see users.authentication.
+AUTH_USER_CACHE_TTL = int(os.environ.get("AUTH_USER_CACHE_TTL", "30"))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Fido Web API",
     "DESCRIPTION": "API documentation for Fido Web",
@@ -0,0 +1,71 @@
+"""
+Frame encoding for the chat and notification sockets.
+
+JSON text frames stay the default. A client that lists one of these
+WebSocket subprotocols gets binary frames instead:
+
+``msgpack``
+    Every frame is one MessagePack-encoded object, in both directions.
+``msgpack.deflate``
+    As ``msgpack``, but each server frame is raw DEFLATE output ending in a
+    sync flush, written by one compressor that lives for the whole
+    connection. The client feeds frames in order to a single raw inflater
+    (``wbits=-DEFLATE_WBITS``). This is what permessage-deflate does, done
+    in the app because Daphne does not negotiate the extension. Servers
+    that do negotiate it (uvicorn, for example) compress plain ``msgpack``
+    frames on their own.
+"""
+
+import json
+import zlib
+
+import msgpack
+
+MSGPACK = "msgpack"
+MSGPACK_DEFLATE = "msgpack.deflate"
+# Preferred first when a client offers several.
+SUBPROTOCOLS = (MSGPACK_DEFLATE, MSGPACK)
+
+# A 4 KiB window and memLevel 5 cost about 32 KiB per connection, which is
+# enough to reuse the keys and usernames repeated from one event to the next.
+DEFLATE_WBITS = 12
+DEFLATE_MEMLEVEL = 5
+
+
+class FrameCodecMixin:
+    """
+    Consumer mixin: call ``accept_negotiated()`` instead of ``accept()``,
+    ``send_event(data)`` instead of ``send(text_data=json.dumps(data))`` and
+    ``decode_frame(text_data, bytes_data)`` in ``receive``.
+    """
+
+    subprotocol = None
+    compressor = None
+
+    async def accept_negotiated(self):
+        offered = self.scope.get("subprotocols") or []
+        self.subprotocol = next((p for p in SUBPROTOCOLS if p in offered), None)
+        if self.subprotocol == MSGPACK_DEFLATE:
+            self.compressor = zlib.compressobj(
+                zlib.Z_DEFAULT_COMPRESSION,
+                zlib.DEFLATED,
+                -DEFLATE_WBITS,
+                DEFLATE_MEMLEVEL,
+            )
+        await self.accept(subprotocol=self.subprotocol)
+
+    async def send_event(self, data):
+        if self.subprotocol is None:
+            await self.send(text_data=json.dumps(data))
+            return
+        frame = msgpack.packb(data)
+        if self.compressor is not None:
+            frame = self.compressor.compress(frame) + self.compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+        await self.send(bytes_data=frame)
+
+    def decode_frame(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            return msgpack.unpackb(bytes_data)
+        return json.loads(text_data)
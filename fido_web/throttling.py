@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+
+from rest_framework.throttling import SimpleRateThrottle
+
+logger = logging.getLogger(__name__)
+
+# Used only while the shared cache is unreachable; limits become per process.
+_local_buckets = {}
+_local_lock = threading.Lock()
+LOCAL_MAX_BUCKETS = 10000
+
+# A bucket is read and written back under a short cache lock; a request that
+# cannot get it after LOCK_ATTEMPTS tries is refused.
+LOCK_TIMEOUT = 1
+LOCK_ATTEMPTS = 5
+LOCK_WAIT = 0.01
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket on top of DRF's ``scope`` / ``DEFAULT_THROTTLE_RATES``.
+
+    A rate of ``"5/min"`` is a bucket of 5 tokens refilled at 5 per minute, so
+    short bursts up to the bucket size pass and sustained traffic is held to
+    the rate. Each bucket is one ``(tokens, updated_at)`` pair in the default
+    cache, updated while holding a ``cache.add`` lock so concurrent workers
+    cannot spend the same tokens twice; if the cache raises, an in-process
+    dict takes over so the endpoint stays protected. Throttles run in
+    ``APIView.initial()``, before the handler, so refused requests never
+    reach the password hasher.
+    """
+
+    cache_format = "throttle_bucket_%(scope)s_%(ident)s"
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        self.now = self.timer()
+        try:
+            return self.take_shared_token()
+        except Exception:
+            logger.warning("Throttle cache unavailable, using local buckets")
+            with _local_lock:
+                if len(_local_buckets) > LOCAL_MAX_BUCKETS:
+                    _local_buckets.clear()
+                return self.take_token(_local_buckets.get, self.set_local)
+
+    def take_shared_token(self):
+        lock_key = f"{self.key}_lock"
+        for _ in range(LOCK_ATTEMPTS):
+            if self.cache.add(lock_key, 1, LOCK_TIMEOUT):
+                try:
+                    return self.take_token(self.cache.get, self.cache.set)
+                finally:
+                    self.cache.delete(lock_key)
+            time.sleep(LOCK_WAIT)
+        # Still contended: this bucket is being hit concurrently.
+        self.tokens = 0
+        return False
+
+    def take_token(self, load, store):
+        tokens, updated_at = load(self.key) or (self.num_requests, self.now)
+        refill = (self.now - updated_at) * self.num_requests / self.duration
+        self.tokens = min(self.num_requests, tokens + refill)
+        allowed = self.tokens >= 1
+        if allowed:
+            self.tokens -= 1
+        store(self.key, (self.tokens, self.now), self.duration)
+        return allowed
+
+    @staticmethod
+    def set_local(key, value, timeout):
+        _local_buckets[key] = value
+
+    def wait(self):
+        """Seconds until the bucket holds a whole token again."""
+        return max(0.0, (1 - self.tokens) * self.duration / self.num_requests)
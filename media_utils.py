@@ -1,14 +1,26 @@
 import os
+import random
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 from io import BytesIO
+from urllib.parse import unquote, urlsplit
 
 from django.conf import settings
 from django.core.files.base import ContentFile
-from django.core.files.storage import FileSystemStorage
+from django.core.files.storage import FileSystemStorage, InMemoryStorage, Storage
 from PIL import Image
 from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+_storage_override = threading.local()
 
 
 def get_media_storage():
+    override = getattr(_storage_override, "storage", None)
+    if override is not None:
+        return override
     if getattr(settings, "DEBUG", True):
         return LocalMediaStorage()
     required = [
@@ -22,12 +34,37 @@ def get_media_storage():
     return LocalMediaStorage()
 
 
+@contextmanager
+def media_storage_override(storage, *fields):
+    """
+    Send get_media_storage() in this thread, and the given file fields, to
+    ``storage`` for the duration of the block (benchmarks and tests).
+
+    Field storages are class attributes, so that part applies to every thread.
+    """
+    previous = getattr(_storage_override, "storage", None)
+    field_storages = [(field, field.storage) for field in fields]
+    _storage_override.storage = storage
+    for field in fields:
+        field.storage = storage
+    try:
+        yield storage
+    finally:
+        _storage_override.storage = previous
+        for field, field_storage in field_storages:
+            field.storage = field_storage
+
+
 class LocalMediaStorage(FileSystemStorage):
     def __init__(self, location=None, base_url=None):
         location = location or os.path.join(settings.BASE_DIR, "media")
         base_url = base_url or "/media/"
         super().__init__(location, base_url)
 
+    def delete_many(self, names):
+        for name in names:
+            self.delete(name)
+
 
 class S3MediaStorage(S3Boto3Storage):
     location = "media"
@@ -35,6 +72,159 @@ class S3MediaStorage(S3Boto3Storage):
     file_overwrite = False
     custom_domain = getattr(settings, "AWS_CLOUDFRONT_DOMAIN", None)
 
+    def delete_many(self, names):
+        # One DeleteObjects request per call; S3 accepts up to 1000 keys.
+        keys = [{"Key": self._normalize_name(clean_name(name))} for name in names]
+        if keys:
+            self.bucket.delete_objects(Delete={"Objects": keys, "Quiet": True})
+
+
+class InjectedStorageError(OSError):
+    pass
+
+
+StorageCall = namedtuple("StorageCall", ["operation", "name", "seconds", "failed"])
+
+
+class LatencyMediaStorage(Storage):
+    """
+    Storage that behaves like a remote object store for benchmarks and tests.
+
+    Files are kept in memory (``backend="memory"``) or on disk
+    (``backend="disk"``). Every round trip sleeps for ``latency`` seconds plus
+    up to ``jitter`` seconds, fails with ``failure_rate`` probability, and is
+    recorded in ``calls``. ``latency`` may also be a mapping of operation name
+    to seconds, with an optional ``"default"`` entry.
+    """
+
+    def __init__(
+        self,
+        backend="memory",
+        latency=0.0,
+        jitter=0.0,
+        failure_rate=0.0,
+        seed=None,
+        location=None,
+        base_url=None,
+    ):
+        if backend == "memory":
+            self.inner = InMemoryStorage(
+                location=location, base_url=base_url or "/media/"
+            )
+        elif backend == "disk":
+            self.inner = LocalMediaStorage(location=location, base_url=base_url)
+        else:
+            raise ValueError(f"Unknown storage backend: {backend}")
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = []
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _delay_for(self, operation):
+        if isinstance(self.latency, dict):
+            base = self.latency.get(operation, self.latency.get("default", 0.0))
+        else:
+            base = self.latency
+        with self._lock:
+            jitter = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+            failed = self._random.random() < self.failure_rate
+        return base + jitter, failed
+
+    def _call(self, operation, name, func, *args):
+        delay, failed = self._delay_for(operation)
+        start = time.perf_counter()
+        try:
+            if delay:
+                time.sleep(delay)
+            if failed:
+                raise InjectedStorageError(f"Injected {operation} failure: {name}")
+            return func(*args)
+        finally:
+            self.calls.append(
+                StorageCall(operation, name, time.perf_counter() - start, failed)
+            )
+
+    def reset_calls(self):
+        self.calls = []
+
+    def summary(self):
+        """Return ``{operation: {"count", "failures", "total", "mean", "max"}}``."""
+        stats = {}
+        for call in self.calls:
+            entry = stats.setdefault(
+                call.operation,
+                {"count": 0, "failures": 0, "total": 0.0, "mean": 0.0, "max": 0.0},
+            )
+            entry["count"] += 1
+            entry["failures"] += int(call.failed)
+            entry["total"] += call.seconds
+            entry["max"] = max(entry["max"], call.seconds)
+        for entry in stats.values():
+            entry["mean"] = entry["total"] / entry["count"]
+        return stats
+
+    def _open(self, name, mode="rb"):
+        return self._call("open", name, self.inner._open, name, mode)
+
+    def _save(self, name, content):
+        return self._call("save", name, self.inner._save, name, content)
+
+    def delete(self, name):
+        return self._call("delete", name, self.inner.delete, name)
+
+    def delete_many(self, names):
+        # A single batched request, like S3MediaStorage.delete_many.
+        return self._call("delete_many", None, self._delete_each, names)
+
+    def _delete_each(self, names):
+        for name in names:
+            self.inner.delete(name)
+
+    def exists(self, name):
+        return self._call("exists", name, self.inner.exists, name)
+
+    def listdir(self, path):
+        return self._call("listdir", path, self.inner.listdir, path)
+
+    def size(self, name):
+        return self._call("size", name, self.inner.size, name)
+
+    def get_modified_time(self, name):
+        return self._call("get_modified_time", name, self.inner.get_modified_time, name)
+
+    def path(self, name):
+        return self.inner.path(name)
+
+    def url(self, name):
+        return self.inner.url(name)
+
+
+def iter_storage_files(storage, path=""):
+    """Yield every file name below ``path``, one directory listing at a time."""
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield f"{path}/{name}" if path else name
+    for directory in directories:
+        yield from iter_storage_files(
+            storage, f"{path}/{directory}" if path else directory
+        )
+
+
+def storage_name_from_url(url, storage):
+    """Map a URL produced by ``storage.url()`` back to the stored file name."""
+    if not url:
+        return None
+    prefix = unquote(urlsplit(storage.url("")).path).rstrip("/")
+    path = unquote(urlsplit(url).path)
+    if not path.startswith(prefix):
+        return None
+    return path[len(prefix) :].lstrip("/") or None
+
 
 class ImageVariantMixin:
     VARIANTS = {
@@ -55,6 +245,7 @@ class ImageVariantMixin:
                 f"{base_path}_{key}.{img.format.lower() if img.format else 'jpg'}"
             )
             file_content = ContentFile(buffer.getvalue())
-            storage.save(file_name, file_content)
-            variants[key] = storage.url(file_name)
+            # The storage may pick a different name when file_name is taken.
+            saved_name = storage.save(file_name, file_content)
+            variants[key] = storage.url(saved_name)
         return variants
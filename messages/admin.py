@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 
-from .models import Message
+from .models import Conversation, Message
+from .search import fts_available, matching_ids
 
 
 @admin.register(Message)
@@ -8,4 +11,31 @@ class MessageAdmin(admin.ModelAdmin):
     list_display = ("id", "sender", "recipient", "content", "is_read", "created_at")
     list_filter = ("is_read", "created_at")
     search_fields = ("sender__username", "recipient__username", "content")
+    search_help_text = "Words in the message, or the exact username of either side."
     raw_id_fields = ("sender", "recipient")
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not fts_available():
+            return super().get_search_results(request, queryset, search_term)
+        users = get_user_model().objects.filter(username=search_term).values("id")
+        # Every match, so the changelist count and pages cover all of them.
+        matches = matching_ids(search_term)
+        words = Q(id__in=matches) if matches is not None else Q(pk__in=[])
+        return (
+            queryset.filter(words | Q(sender_id__in=users) | Q(recipient_id__in=users)),
+            False,
+        )
+
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "user_low",
+        "user_high",
+        "last_activity",
+        "unread_low",
+        "unread_high",
+    )
+    search_fields = ("user_low__username", "user_high__username")
+    raw_id_fields = ("user_low", "user_high", "last_message")
@@ -1,47 +1,184 @@
-import json
+import asyncio
+import logging
 
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.contrib.auth import get_user_model
+from django.db import transaction
 
-from .models import Message
-from .serializers import MessageSerializer
+from fido_web.presence import PresenceMixin
+from fido_web.replay import ReplayMixin
+from fido_web.socket_codec import FrameCodecMixin
 
+from .conversations import mark_read, record_message
+from .models import Message, conversation_key
+from .serializers import message_payload
 
-class ChatConsumer(AsyncWebsocketConsumer):
+logger = logging.getLogger(__name__)
+
+# Messages from one socket are written at most this long after they arrive,
+# or as soon as this many are waiting.
+WRITE_BEHIND_DELAY = 0.05
+WRITE_BEHIND_MAX_BATCH = 50
+
+
+class ChatConsumer(ReplayMixin, FrameCodecMixin, PresenceMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
-        self.other_user_id = self.scope["url_route"]["kwargs"]["user_id"]
+        self.other_user_id = int(self.scope["url_route"]["kwargs"]["user_id"])
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+        # Resolved once; every message on this socket reuses the ids and names.
+        self.other_username = await self.get_username(self.other_user_id)
+        if self.other_username is None:
+            await self.close()
+            return
+        self.pending = []
+        self.flush_task = None
+        self.write_lock = asyncio.Lock()
         self.room_name = self.get_room_name(self.user.id, self.other_user_id)
         await self.channel_layer.group_add(self.room_name, self.channel_name)
-        await self.accept()
+        await self.join_presence(self.user.id)
+        await self.accept_negotiated()
+        await self.replay(self.load_missed_messages)
 
     async def disconnect(self, close_code):
+        if not hasattr(self, "room_name"):
+            return
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        await self.flush()
+        await self.leave_presence()
         await self.channel_layer.group_discard(self.room_name, self.channel_name)
 
     async def receive(self, text_data=None, bytes_data=None):
-        data = json.loads(text_data)
-        message = await self.create_message(data)
-        serialized = MessageSerializer(message).data
-        await self.channel_layer.group_send(
-            self.room_name, {"type": "chat_message", "message": serialized}
+        data = self.decode_frame(text_data, bytes_data)
+        if data.get("type") == "read":
+            await self.read_receipt(data.get("last_read_id"))
+            return
+        if data.get("type") == "typing":
+            await self.channel_layer.group_send(
+                self.room_name, {"type": "chat.typing", "user": self.user.id}
+            )
+            return
+        self.pending.append(
+            (
+                data.get("client_id"),
+                Message(
+                    sender_id=self.user.id,
+                    recipient_id=self.other_user_id,
+                    conversation_key=conversation_key(self.user.id, self.other_user_id),
+                    content=data.get("content", ""),
+                    image=data.get("image"),
+                    video=data.get("video"),
+                ),
+            )
         )
+        if len(self.pending) >= WRITE_BEHIND_MAX_BATCH:
+            await self.flush()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(WRITE_BEHIND_DELAY)
+        self.flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Write everything waiting in one transaction, then publish it."""
+        async with self.write_lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+            client_ids = [client_id for client_id, _ in batch]
+            try:
+                messages = await self.create_messages([m for _, m in batch])
+            except Exception:
+                logger.exception("Could not store %d chat messages", len(batch))
+                await self.send_event({"type": "error", "client_ids": client_ids})
+                return
+            # The echo on the sender's own socket doubles as the ack.
+            for client_id, message in zip(client_ids, messages):
+                await self.channel_layer.group_send(
+                    self.room_name,
+                    {
+                        "type": "chat_message",
+                        "message": {
+                            **message_payload(
+                                message, self.user.username, self.other_username
+                            ),
+                            "client_id": client_id,
+                        },
+                    },
+                )
 
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps(event["message"]))
+        if not self.already_replayed(event["message"]["id"]):
+            await self.send_event(event["message"])
+
+    async def read_receipt(self, last_read_id):
+        if not isinstance(last_read_id, int) or last_read_id < 1:
+            return
+        marked = await database_sync_to_async(mark_read)(
+            self.user.id, self.other_user_id, last_read_id
+        )
+        if marked:
+            await self.channel_layer.group_send(
+                self.room_name,
+                {
+                    "type": "chat.receipt",
+                    "reader": self.user.id,
+                    "last_read_id": last_read_id,
+                },
+            )
+
+    async def chat_receipt(self, event):
+        # Only the other participant needs to hear about it.
+        if event["reader"] != self.user.id:
+            await self.send_event(
+                {
+                    "type": "read",
+                    "reader": event["reader"],
+                    "last_read_id": event["last_read_id"],
+                }
+            )
+
+    async def chat_typing(self, event):
+        if event["user"] != self.user.id:
+            await self.send_event({"type": "typing", "user": event["user"]})
 
     @database_sync_to_async
-    def create_message(self, data):
-        from users.models import CustomUser
-
-        sender = self.user
-        recipient = CustomUser.objects.get(pk=self.other_user_id)
-        return Message.objects.create(
-            sender=sender,
-            recipient=recipient,
-            content=data.get("content", ""),
-            image=data.get("image"),
-            video=data.get("video"),
+    def get_username(self, user_id):
+        return (
+            get_user_model()
+            .objects.filter(pk=user_id)
+            .values_list("username", flat=True)
+            .first()
         )
 
+    def load_missed_messages(self, since, limit):
+        usernames = {
+            self.user.id: self.user.username,
+            self.other_user_id: self.other_username,
+        }
+        messages = Message.objects.filter(
+            conversation_key=conversation_key(self.user.id, self.other_user_id),
+            id__gt=since,
+        ).order_by("id")[:limit]
+        return [
+            message_payload(
+                message, usernames[message.sender_id], usernames[message.recipient_id]
+            )
+            for message in messages
+        ]
+
+    @database_sync_to_async
+    def create_messages(self, messages):
+        with transaction.atomic():
+            messages = Message.objects.bulk_create(messages)
+            record_message(messages[-1], count=len(messages))
+        return messages
+
     def get_room_name(self, user1_id, user2_id):
-        return f"chat_{min(user1_id, user2_id)}_{max(user1_id, user2_id)}"
+        return f"chat_{conversation_key(int(user1_id), int(user2_id))}"
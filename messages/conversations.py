@@ -0,0 +1,127 @@
+"""
+Per-pair conversation summaries.
+
+Every new message goes through ``record_message`` in the transaction that
+created it: one UPDATE moves the pair's Conversation row to the new message
+and bumps the recipient's unread counter, and the row is created on the
+pair's first message. Read receipts go through ``mark_read``, which flips
+``is_read`` with one bulk UPDATE and takes the same number off the reader's
+counter.
+"""
+
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+from fido_web.conditional import bump_read_state
+
+from .models import Conversation, Message, conversation_key
+
+# Receipts no newer than one applied this recently are dropped unseen.
+READ_RECEIPT_WINDOW = 2
+
+
+def ordered_pair(user_id, other_id):
+    return min(user_id, other_id), max(user_id, other_id)
+
+
+def unread_field(user_low_id, user_id):
+    return "unread_low" if user_id == user_low_id else "unread_high"
+
+
+def record_message(message, count=1):
+    """
+    Move the pair's summary to ``message``.
+
+    ``count`` is how many new messages from the same sender it stands for,
+    so a batch written at once needs one call for its newest message.
+    """
+    low, high = ordered_pair(message.sender_id, message.recipient_id)
+    unread = None
+    if message.sender_id != message.recipient_id:
+        unread = unread_field(low, message.recipient_id)
+    conversation = Conversation.objects.filter(user_low_id=low, user_high_id=high)
+    # Messages committed out of order must not move the summary backwards.
+    changes = {
+        "last_message_id": Case(
+            When(last_activity__gt=message.created_at, then=F("last_message_id")),
+            default=Value(message.id),
+        ),
+        "last_activity": Greatest("last_activity", Value(message.created_at)),
+    }
+    if unread:
+        changes[unread] = F(unread) + count
+    with transaction.atomic():
+        if conversation.update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                Conversation.objects.create(
+                    user_low_id=low,
+                    user_high_id=high,
+                    last_message_id=message.id,
+                    last_activity=message.created_at,
+                    **({unread: count} if unread else {}),
+                )
+        except IntegrityError:
+            # The pair's first two messages raced; the other one created it.
+            conversation.update(**changes)
+
+
+def inbox_for(user):
+    """``user``'s conversations, annotated with the other side and own unread count."""
+    return (
+        Conversation.objects.filter(Q(user_low=user) | Q(user_high=user))
+        .annotate(
+            other_user_id=Case(
+                When(user_low=user, then=F("user_high_id")),
+                default=F("user_low_id"),
+            ),
+            unread_count=Case(
+                When(user_low=user, then=F("unread_low")),
+                default=F("unread_high"),
+            ),
+        )
+        .select_related("last_message")
+    )
+
+
+def conversation_partners(user_id, other_ids):
+    """The subset of ``other_ids`` that ``user_id`` has a conversation with."""
+    pairs = Conversation.objects.filter(
+        Q(user_low_id=user_id, user_high_id__in=other_ids)
+        | Q(user_high_id=user_id, user_low_id__in=other_ids)
+    ).values_list("user_low_id", "user_high_id")
+    return {low if high == user_id else high for low, high in pairs}
+
+
+def mark_read(reader_id, other_id, up_to_id):
+    """
+    Mark the messages ``other_id`` sent ``reader_id`` up to ``up_to_id`` read.
+
+    Returns how many messages changed state. Clients report the newest id
+    they have seen on every scroll, so repeats within READ_RECEIPT_WINDOW
+    that do not move past the last applied id cost a cache read only.
+    """
+    key = conversation_key(reader_id, other_id)
+    coalesce_key = f"read_receipt:{reader_id}:{key}"
+    if (cache.get(coalesce_key) or 0) >= up_to_id:
+        return 0
+    cache.set(coalesce_key, up_to_id, timeout=READ_RECEIPT_WINDOW)
+    with transaction.atomic():
+        marked = Message.objects.filter(
+            conversation_key=key,
+            recipient_id=reader_id,
+            is_read=False,
+            id__lte=up_to_id,
+        ).update(is_read=True)
+        if marked and reader_id != other_id:
+            low, high = ordered_pair(reader_id, other_id)
+            unread = unread_field(low, reader_id)
+            Conversation.objects.filter(user_low_id=low, user_high_id=high).update(
+                **{unread: Greatest(F(unread) - marked, Value(0))}
+            )
+        if marked:
+            bump_read_state("messages", reader_id, other_id)
+    return marked
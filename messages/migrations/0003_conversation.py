@@ -0,0 +1,105 @@
+# Generated by Django 5.2.1 on 2026-10-19 00:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_conversations(apps, schema_editor):
+    Message = apps.get_model("user_messages", "Message")
+    Conversation = apps.get_model("user_messages", "Conversation")
+    summaries = {}
+    messages = (
+        Message.objects.order_by("id")
+        .values_list("id", "sender_id", "recipient_id", "is_read", "created_at")
+        .iterator(chunk_size=2000)
+    )
+    for message_id, sender_id, recipient_id, is_read, created_at in messages:
+        low, high = min(sender_id, recipient_id), max(sender_id, recipient_id)
+        summary = summaries.get((low, high))
+        if summary is None:
+            summary = summaries[low, high] = Conversation(
+                user_low_id=low, user_high_id=high, last_activity=created_at
+            )
+        if created_at >= summary.last_activity:
+            summary.last_message_id = message_id
+            summary.last_activity = created_at
+        if not is_read and sender_id != recipient_id:
+            if recipient_id == low:
+                summary.unread_low += 1
+            else:
+                summary.unread_high += 1
+    Conversation.objects.bulk_create(summaries.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_messages", "0002_message_image_message_video_alter_message_content"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Conversation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_activity", models.DateTimeField()),
+                ("unread_low", models.PositiveIntegerField(default=0)),
+                ("unread_high", models.PositiveIntegerField(default=0)),
+                (
+                    "last_message",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="user_messages.message",
+                    ),
+                ),
+                (
+                    "user_high",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user_low",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["user_low", "last_activity", "id"],
+                        name="conversation_low_activity_idx",
+                    ),
+                    models.Index(
+                        fields=["user_high", "last_activity", "id"],
+                        name="conversation_high_activity_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user_low", "user_high"),
+                        name="conversation_pair_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_conversations, migrations.RunPython.noop),
+    ]
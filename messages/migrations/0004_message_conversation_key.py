@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-19 02:10
+
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat, Greatest, Least
+
+
+def backfill_conversation_keys(apps, schema_editor):
+    Message = apps.get_model("user_messages", "Message")
+    Message.objects.update(
+        conversation_key=Concat(
+            Cast(Least("sender_id", "recipient_id"), CharField()),
+            Value("_"),
+            Cast(Greatest("sender_id", "recipient_id"), CharField()),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_messages", "0003_conversation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="message",
+            name="conversation_key",
+            field=models.CharField(default="", editable=False, max_length=41),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_conversation_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["conversation_key", "created_at", "id"],
+                name="message_thread_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+
+FTS_TABLE = "user_messages_message_fts"
+
+CREATE_SQL = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+    "content, participants, tokenize='unicode61 remove_diacritics 2')",
+    f"INSERT INTO {FTS_TABLE}(rowid, content, participants) "
+    "SELECT id, content, 'u' || sender_id || ' u' || recipient_id "
+    "FROM user_messages_message",
+    f"CREATE TRIGGER user_messages_message_fts_insert "
+    f"AFTER INSERT ON user_messages_message BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, content, participants) VALUES "
+    "(new.id, new.content, 'u' || new.sender_id || ' u' || new.recipient_id); END",
+    f"CREATE TRIGGER user_messages_message_fts_update "
+    f"AFTER UPDATE OF content ON user_messages_message BEGIN "
+    f"UPDATE {FTS_TABLE} SET content = new.content WHERE rowid = new.id; END",
+    f"CREATE TRIGGER user_messages_message_fts_delete "
+    f"AFTER DELETE ON user_messages_message BEGIN "
+    f"DELETE FROM {FTS_TABLE} WHERE rowid = old.id; END",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS user_messages_message_fts_insert",
+    "DROP TRIGGER IF EXISTS user_messages_message_fts_update",
+    "DROP TRIGGER IF EXISTS user_messages_message_fts_delete",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        # FTS5 is SQLite only; messages.search falls back to a LIKE scan.
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user_messages", "0004_message_conversation_key"),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE_SQL), run(DROP_SQL)),
+    ]
@@ -1,9 +1,15 @@
 from django.db import models
 
+from fido_web.conditional import bump_read_state
 from media_utils import get_media_storage
 from users.models import CustomUser
 
 
+def conversation_key(user_id, other_id):
+    """The same key for both directions of a pair of users."""
+    return f"{min(user_id, other_id)}_{max(user_id, other_id)}"
+
+
 class Message(models.Model):
     sender = models.ForeignKey(
         CustomUser, on_delete=models.CASCADE, related_name="sent_messages"
@@ -20,6 +26,69 @@ class Message(models.Model):
     )
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Denormalized from sender/recipient so a thread is one index range.
+    conversation_key = models.CharField(max_length=41, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["conversation_key", "created_at", "id"],
+                name="message_thread_idx",
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.conversation_key:
+            self.conversation_key = conversation_key(self.sender_id, self.recipient_id)
+        updating = not self._state.adding
+        super().save(*args, **kwargs)
+        if updating:
+            bump_read_state("messages", self.sender_id, self.recipient_id)
+
+    def delete(self, *args, **kwargs):
+        bump_read_state("messages", self.sender_id, self.recipient_id)
+        return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f"From {self.sender.username} to {self.recipient.username}: {self.content[:30]}"
+
+
+class Conversation(models.Model):
+    """
+    Inbox summary for one pair of users, maintained by messages.conversations.
+
+    The pair is stored ordered (``user_low_id < user_high_id``) so there is
+    exactly one row per pair, whoever wrote first.
+    """
+
+    user_low = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="+")
+    user_high = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="+"
+    )
+    last_message = models.ForeignKey(
+        Message, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    last_activity = models.DateTimeField()
+    unread_low = models.PositiveIntegerField(default=0)
+    unread_high = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user_low", "user_high"], name="conversation_pair_unique"
+            )
+        ]
+        indexes = [
+            # Keyset pagination of each participant's inbox, newest first.
+            models.Index(
+                fields=["user_low", "last_activity", "id"],
+                name="conversation_low_activity_idx",
+            ),
+            models.Index(
+                fields=["user_high", "last_activity", "id"],
+                name="conversation_high_activity_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Conversation {self.user_low_id} <-> {self.user_high_id}"
@@ -0,0 +1,84 @@
+"""
+Full-text search over direct messages.
+
+On SQLite, migration 0005 keeps ``user_messages_message_fts``, an FTS5 table
+with one row per message (rowid = message id), in step with triggers. Its
+``participants`` column holds ``u<sender_id> u<recipient_id>``, so the
+"only my conversations" restriction is one more term of the MATCH rather
+than a filter over every message that contains the words. Other databases
+fall back to a ``content__icontains`` scan.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Message
+
+FTS_TABLE = "user_messages_message_fts"
+MAX_TERMS = 8
+WORD_RE = re.compile(r"\w+")
+
+
+def fts_available():
+    return connection.vendor == "sqlite"
+
+
+def match_expression(query, user_id=None):
+    """
+    FTS5 MATCH string for ``query``: every word as a quoted prefix term,
+    all required. None if the query has no words.
+    """
+    terms = WORD_RE.findall(query)[:MAX_TERMS]
+    if not terms:
+        return None
+    expression = "content : (" + " ".join(f'"{term}"*' for term in terms) + ")"
+    if user_id is not None:
+        expression = f"participants : u{int(user_id)} AND {expression}"
+    return expression
+
+
+def search_message_ids(query, user_id=None, limit=20, offset=0):
+    """Ids of messages matching ``query``, best match first."""
+    expression = match_expression(query, user_id)
+    if expression is None:
+        return []
+    if not fts_available():
+        messages = Message.objects.filter(content__icontains=query)
+        if user_id is not None:
+            messages = messages.filter(Q(sender_id=user_id) | Q(recipient_id=user_id))
+        return list(
+            messages.order_by("-created_at", "-id").values_list("id", flat=True)[
+                offset : offset + limit
+            ]
+        )
+    with connection.cursor() as cursor:
+        # The participants column only filters; it must not affect the score.
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, 1.0, 0.0) LIMIT %s OFFSET %s",
+            [expression, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def matching_ids(query):
+    """
+    Subquery of every message id matching ``query``, for filters that need
+    all of them rather than a ranked page. None if the query has no words.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return None
+    return RawSQL(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression]
+    )
+
+
+def search_messages(user, query, limit=20, offset=0):
+    """``user``'s messages matching ``query`` in rank order."""
+    ids = search_message_ids(query, user.id, limit, offset)
+    messages = Message.objects.in_bulk(ids)
+    return [messages[message_id] for message_id in ids if message_id in messages]
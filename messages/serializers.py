@@ -1,15 +1,14 @@
 from rest_framework import serializers
 
 from users.models import CustomUser
+from users.serializers import UserCardField, UserCardListSerializer, UserCardsMixin
 
-from .models import Message
+from .models import Conversation, Message
 
 
-class MessageSerializer(serializers.ModelSerializer):
-    sender_username = serializers.CharField(source="sender.username", read_only=True)
-    recipient_username = serializers.CharField(
-        source="recipient.username", read_only=True
-    )
+class MessageSerializer(UserCardsMixin, serializers.ModelSerializer):
+    sender_username = UserCardField(source="sender_id", card_field="username")
+    recipient_username = UserCardField(source="recipient_id", card_field="username")
     recipient = serializers.PrimaryKeyRelatedField(
         queryset=CustomUser.objects.all(), required=False
     )
@@ -31,7 +30,51 @@ class MessageSerializer(serializers.ModelSerializer):
             "created_at",
         ]
         read_only_fields = ["id", "created_at", "sender", "sender_username"]
+        list_serializer_class = UserCardListSerializer
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields["recipient"].required = False
+
+
+_datetime = serializers.DateTimeField()
+
+
+def message_payload(message, sender_username, recipient_username):
+    """
+    The MessageSerializer shape, built without touching any relation. Every
+    ``chat_message`` event, from the socket or the REST send, carries this.
+    """
+    return {
+        "id": message.id,
+        "sender": message.sender_id,
+        "sender_username": sender_username,
+        "recipient": message.recipient_id,
+        "recipient_username": recipient_username,
+        "content": message.content,
+        "image": message.image.url if message.image else None,
+        "video": message.video.url if message.video else None,
+        "is_read": message.is_read,
+        "created_at": _datetime.to_representation(message.created_at),
+    }
+
+
+class LastMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Message
+        fields = ["id", "sender", "content", "created_at"]
+
+
+class ConversationSerializer(UserCardsMixin, serializers.ModelSerializer):
+    user = UserCardField(source="other_user_id")
+    last_message = LastMessageSerializer(read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Conversation
+        fields = ["id", "user", "last_message", "last_activity", "unread_count"]
+        list_serializer_class = UserCardListSerializer
+
+
+class ReadReceiptSerializer(serializers.Serializer):
+    last_read_id = serializers.IntegerField(min_value=1)
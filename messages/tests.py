@@ -1,20 +1,36 @@
 import json
 import os
 import tempfile
+import zlib
 from io import BytesIO
+from unittest import mock
 
+import msgpack
 import pytest
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from PIL import Image
 from rest_framework.test import APITestCase
 
+from fido_web import presence
 from fido_web.asgi import application
+from fido_web.socket_codec import DEFLATE_WBITS
 from notifications.models import Notification
-from users.models import CustomUser
+from users.models import CustomUser, Follow
 
-from .models import Message
+from .consumers import ChatConsumer
+from .conversations import mark_read, record_message
+from .models import Conversation, Message, conversation_key
+from .serializers import message_payload
+from .views import MessageSearchView, send_realtime_message
 
 
 class MessageNotificationTests(APITestCase):
@@ -46,6 +62,18 @@ class MessageNotificationTests(APITestCase):
         self.assertIsNotNone(notif)
         self.assertIn("sent you a message", notif.message)
 
+    def test_rest_send_publishes_serializer_shape(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(
+            f"chat_{conversation_key(self.sender.id, self.recipient.id)}", channel
+        )
+        response = self.client.post(
+            self.send_url, {"content": "same shape"}, format="multipart"
+        )
+        event = async_to_sync(layer.receive)(channel)
+        self.assertEqual(event["message"], response.data)
+
     def test_send_image_message_and_notification(self):
         img = Image.new("RGB", (100, 100), color=(255, 0, 0))
         img_io = BytesIO()
@@ -73,7 +101,7 @@ class MessageNotificationTests(APITestCase):
         thread_url = reverse("message-thread", kwargs={"user_id": self.sender.id})
         response = self.client.get(thread_url)
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(any(m["image"] for m in response.data))
+        self.assertTrue(any(m["image"] for m in response.data["results"]))
 
     def test_send_video_message_and_notification(self):
         video_content = b"\x00\x00\x00\x18ftypmp42"  # minimal mp4 header
@@ -99,7 +127,7 @@ class MessageNotificationTests(APITestCase):
         thread_url = reverse("message-thread", kwargs={"user_id": self.sender.id})
         response = self.client.get(thread_url)
         self.assertEqual(response.status_code, 200)
-        self.assertTrue(any(m["video"] for m in response.data))
+        self.assertTrue(any(m["video"] for m in response.data["results"]))
 
 
 @pytest.mark.asyncio
@@ -112,6 +140,7 @@ class TestWebSocketRealtime:
         communicator = WebsocketCommunicator(
             application, f"/ws/notifications/{user.id}/"
         )
+        communicator.scope["user"] = user
         connected, _ = await communicator.connect()
         assert connected
         notif = Notification.objects.create(
@@ -148,6 +177,213 @@ class TestWebSocketRealtime:
         assert data["content"] == "Hello via WebSocket!"
         await communicator.disconnect()
 
+    async def test_chat_burst_is_written_in_one_batch(self, db):
+        sender = CustomUser.objects.create_user(
+            username="wsburst_sender", password="pass1234"
+        )
+        recipient = CustomUser.objects.create_user(
+            username="wsburst_recipient", password="pass1234"
+        )
+        communicator = WebsocketCommunicator(application, f"/ws/chat/{recipient.id}/")
+        communicator.scope["user"] = sender
+        connected, _ = await communicator.connect()
+        assert connected
+        for number in range(3):
+            await communicator.send_json_to(
+                {"client_id": f"c{number}", "content": f"burst {number}"}
+            )
+        ids = []
+        for number in range(3):
+            data = await communicator.receive_json_from()
+            assert data["client_id"] == f"c{number}"
+            assert data["content"] == f"burst {number}"
+            assert data["sender_username"] == "wsburst_sender"
+            assert data["recipient_username"] == "wsburst_recipient"
+            ids.append(data["id"])
+        await communicator.disconnect()
+        conversation = await Conversation.objects.aget()
+        assert conversation.unread_high == 3
+        assert conversation.last_message_id == max(ids)
+
+    async def test_typing_reaches_other_participant(self, db):
+        alice = CustomUser.objects.create_user(
+            username="wstyping_alice", password="pass1234"
+        )
+        bob = CustomUser.objects.create_user(
+            username="wstyping_bob", password="pass1234"
+        )
+        alice_socket = WebsocketCommunicator(application, f"/ws/chat/{bob.id}/")
+        alice_socket.scope["user"] = alice
+        bob_socket = WebsocketCommunicator(application, f"/ws/chat/{alice.id}/")
+        bob_socket.scope["user"] = bob
+        assert (await alice_socket.connect())[0]
+        assert (await bob_socket.connect())[0]
+        await alice_socket.send_json_to({"type": "typing"})
+        assert await bob_socket.receive_json_from() == {
+            "type": "typing",
+            "user": alice.id,
+        }
+        assert await alice_socket.receive_nothing()
+        await alice_socket.disconnect()
+        await bob_socket.disconnect()
+
+    async def test_msgpack_subprotocol(self, db):
+        sender = CustomUser.objects.create_user(
+            username="wsmsgpack_sender", password="pass1234"
+        )
+        recipient = CustomUser.objects.create_user(
+            username="wsmsgpack_recipient", password="pass1234"
+        )
+        for subprotocol in ("msgpack", "msgpack.deflate"):
+            communicator = WebsocketCommunicator(
+                application,
+                f"/ws/chat/{recipient.id}/",
+                subprotocols=["json", subprotocol],
+            )
+            communicator.scope["user"] = sender
+            connected, accepted = await communicator.connect()
+            assert connected
+            assert accepted == subprotocol
+            await communicator.send_to(
+                bytes_data=msgpack.packb({"content": f"via {subprotocol}"})
+            )
+            frame = await communicator.receive_from()
+            assert isinstance(frame, bytes)
+            if subprotocol == "msgpack.deflate":
+                frame = zlib.decompressobj(-DEFLATE_WBITS).decompress(frame)
+            assert msgpack.unpackb(frame)["content"] == f"via {subprotocol}"
+            await communicator.disconnect()
+
+    async def test_reconnect_replays_missed_messages(self, db):
+        sender = CustomUser.objects.create_user(
+            username="wsreplay_sender", password="pass1234"
+        )
+        recipient = CustomUser.objects.create_user(
+            username="wsreplay_recipient", password="pass1234"
+        )
+        seen, missed_1, missed_2 = [
+            Message.objects.create(
+                sender=sender, recipient=recipient, content=f"msg {number}"
+            )
+            for number in range(3)
+        ]
+        communicator = WebsocketCommunicator(
+            application, f"/ws/chat/{sender.id}/?since={seen.id}"
+        )
+        communicator.scope["user"] = recipient
+        connected, _ = await communicator.connect()
+        assert connected
+        assert [(await communicator.receive_json_from())["id"] for _ in range(2)] == [
+            missed_1.id,
+            missed_2.id,
+        ]
+
+        # The late live copy of a replayed message is dropped, new ones pass.
+        live = Message.objects.create(sender=sender, recipient=recipient, content="new")
+        room = f"chat_{conversation_key(sender.id, recipient.id)}"
+        for message in (missed_2, live):
+            await get_channel_layer().group_send(
+                room,
+                {
+                    "type": "chat_message",
+                    "message": message_payload(
+                        message, sender.username, recipient.username
+                    ),
+                },
+            )
+        assert (await communicator.receive_json_from())["id"] == live.id
+        assert await communicator.receive_nothing()
+        await communicator.disconnect()
+
+        with mock.patch("fido_web.replay.REPLAY_LIMIT", 1):
+            communicator = WebsocketCommunicator(
+                application, f"/ws/chat/{sender.id}/?since={seen.id}"
+            )
+            communicator.scope["user"] = recipient
+            await communicator.connect()
+            assert await communicator.receive_json_from() == {"type": "resync"}
+            await communicator.disconnect()
+
+    async def test_message_sent_during_replay_arrives_live(self, db):
+        sender = CustomUser.objects.create_user(username="wsrace_sender")
+        recipient = CustomUser.objects.create_user(username="wsrace_recipient")
+        seen = Message.objects.create(sender=sender, recipient=recipient, content="a")
+        load_missed_messages = ChatConsumer.load_missed_messages
+
+        def load_then_send(consumer, since, limit):
+            events = load_missed_messages(consumer, since, limit)
+            # Committed after the replay query, before connect() returns.
+            send_realtime_message(
+                Message.objects.create(
+                    sender=sender, recipient=recipient, content="during replay"
+                )
+            )
+            return events
+
+        with (
+            override_settings(PRESENCE_SKIP_OFFLINE=True),
+            mock.patch.object(ChatConsumer, "load_missed_messages", load_then_send),
+        ):
+            communicator = WebsocketCommunicator(
+                application, f"/ws/chat/{sender.id}/?since={seen.id}"
+            )
+            communicator.scope["user"] = recipient
+            connected, _ = await communicator.connect()
+            assert connected
+            data = await communicator.receive_json_from()
+            assert data["content"] == "during replay"
+            await communicator.disconnect()
+
+    async def test_reconnect_replays_missed_notifications(self, db):
+        user = CustomUser.objects.create_user(
+            username="wsreplay_notify", password="pass1234"
+        )
+        seen, missed = [
+            Notification.objects.create(
+                recipient=user,
+                sender=user,
+                notification_type="like",
+                message=f"notification {number}",
+            )
+            for number in range(2)
+        ]
+        communicator = WebsocketCommunicator(
+            application, f"/ws/notifications/{user.id}/?since={seen.id}"
+        )
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        assert connected
+        data = await communicator.receive_json_from()
+        assert data["id"] == missed.id
+        assert data["message"] == "notification 1"
+        assert await communicator.receive_nothing()
+        await communicator.disconnect()
+
+    async def test_notification_socket_rejects_anonymous_user(self, db):
+        user = CustomUser.objects.create_user(username="wsnotify_anon")
+        Notification.objects.create(
+            recipient=user, sender=user, notification_type="like", message="private"
+        )
+        communicator = WebsocketCommunicator(
+            application, f"/ws/notifications/{user.id}/?since=0"
+        )
+        communicator.scope["user"] = AnonymousUser()
+        connected, _ = await communicator.connect()
+        assert not connected
+
+    async def test_notification_socket_rejects_other_user(self, db):
+        owner = CustomUser.objects.create_user(username="wsnotify_owner")
+        intruder = CustomUser.objects.create_user(username="wsnotify_intruder")
+        Notification.objects.create(
+            recipient=owner, sender=owner, notification_type="like", message="private"
+        )
+        communicator = WebsocketCommunicator(
+            application, f"/ws/notifications/{owner.id}/?since=0"
+        )
+        communicator.scope["user"] = intruder
+        connected, _ = await communicator.connect()
+        assert not connected
+
 
 @pytest.mark.asyncio
 class TestWebSocketRealtimeMessage:
@@ -192,11 +428,478 @@ class TestWebSocketRealtimeMessage:
         response = await communicator.receive_from()
         data = json.loads(response)
         assert data["id"] == msg.id
-        assert data["sender"] == sender.username
-        assert data["recipient"] == recipient.username
+        assert data["sender"] == sender.id
+        assert data["sender_username"] == sender.username
+        assert data["recipient_username"] == recipient.username
         assert data["content"] == "Hello with media!"
         assert data["image"].endswith(".jpg")
         assert data["video"].endswith(".mp4")
         await communicator.disconnect()
         os.unlink(img_file.name)
         os.unlink(vid_file.name)
+
+
+class PrivateMediaServingTests(APITestCase):
+    def setUp(self):
+        self.sender = CustomUser.objects.create_user(
+            username="media_sender", password="pass1234"
+        )
+        self.recipient = CustomUser.objects.create_user(
+            username="media_recipient", password="pass1234"
+        )
+        self.outsider = CustomUser.objects.create_user(
+            username="media_outsider", password="pass1234"
+        )
+        self.message = Message.objects.create(
+            sender=self.sender, recipient=self.recipient
+        )
+        self.message.video.save(
+            "clip.mp4", SimpleUploadedFile("clip.mp4", b"0123456789")
+        )
+        self.url = self.message.video.url
+
+    def tearDown(self):
+        self.message.video.delete(save=False)
+
+    def test_participants_only(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.client.force_login(self.outsider)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.client.force_login(self.recipient)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertTrue(response["Cache-Control"].startswith("private"))
+
+    def test_file_shared_by_several_messages(self):
+        other = Message.objects.create(
+            sender=self.outsider, recipient=self.outsider, video=self.message.video.name
+        )
+        self.client.force_login(self.outsider)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        other.delete()
+
+    def test_range_and_conditional_get(self):
+        self.client.force_login(self.sender)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=20-")
+        self.assertEqual(response.status_code, 416)
+
+    def test_accel_redirect_offload(self):
+        self.client.force_login(self.sender)
+        with self.settings(MEDIA_ACCEL_BACKEND="nginx"):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            f"/protected-media/{self.message.video.name}",
+        )
+
+
+class ConversationInboxTests(APITestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(
+            username="inbox_alice", password="pass1234"
+        )
+        self.bob = CustomUser.objects.create_user(
+            username="inbox_bob", password="pass1234"
+        )
+        self.carol = CustomUser.objects.create_user(
+            username="inbox_carol", password="pass1234"
+        )
+        self.url = reverse("message-inbox")
+
+    def send(self, sender, recipient, content):
+        self.client.force_authenticate(user=sender)
+        response = self.client.post(
+            reverse("message-send", kwargs={"user_id": recipient.id}),
+            {"content": content},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_one_summary_per_pair(self):
+        self.send(self.alice, self.bob, "hi bob")
+        self.send(self.bob, self.alice, "hi alice")
+        self.send(self.alice, self.bob, "how are you?")
+        self.assertEqual(Conversation.objects.count(), 1)
+        conversation = Conversation.objects.get()
+        self.assertEqual(
+            (conversation.user_low_id, conversation.user_high_id),
+            (self.alice.id, self.bob.id),
+        )
+        self.assertEqual(conversation.last_message.content, "how are you?")
+        self.assertEqual(conversation.unread_low, 1)
+        self.assertEqual(conversation.unread_high, 2)
+
+    def test_inbox_lists_conversations_by_activity(self):
+        self.send(self.bob, self.alice, "from bob")
+        self.send(self.carol, self.alice, "from carol")
+        self.send(self.carol, self.alice, "carol again")
+        self.client.force_authenticate(user=self.alice)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        results = response.data["results"]
+        self.assertEqual(
+            [row["user"]["username"] for row in results],
+            ["inbox_carol", "inbox_bob"],
+        )
+        self.assertEqual(results[0]["last_message"]["content"], "carol again")
+        self.assertEqual([row["unread_count"] for row in results], [2, 1])
+
+        self.client.force_authenticate(user=self.bob)
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["user"]["id"], self.alice.id)
+        self.assertEqual(response.data["results"][0]["unread_count"], 0)
+
+    def test_inbox_keyset_pagination(self):
+        self.send(self.bob, self.alice, "first")
+        self.send(self.carol, self.alice, "second")
+        self.client.force_authenticate(user=self.alice)
+        response = self.client.get(self.url, {"page_size": 1})
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["user"]["id"], self.carol.id)
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["user"]["id"], self.bob.id)
+        self.assertIsNone(response.data["next"])
+
+
+@override_settings(SHARED_CACHE=True)
+class MessageThreadTests(APITestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(
+            username="thread_alice", password="pass1234"
+        )
+        self.bob = CustomUser.objects.create_user(
+            username="thread_bob", password="pass1234"
+        )
+        self.carol = CustomUser.objects.create_user(
+            username="thread_carol", password="pass1234"
+        )
+        for number in range(5):
+            sender, recipient = (
+                (self.alice, self.bob) if number % 2 else (self.bob, self.alice)
+            )
+            Message.objects.create(
+                sender=sender, recipient=recipient, content=f"msg {number}"
+            )
+        Message.objects.create(sender=self.alice, recipient=self.carol, content="x")
+        self.client.force_authenticate(user=self.alice)
+        self.url = reverse("message-thread", kwargs={"user_id": self.bob.id})
+
+    def test_both_directions_share_a_key(self):
+        keys = set(
+            Message.objects.exclude(recipient=self.carol).values_list(
+                "conversation_key", flat=True
+            )
+        )
+        self.assertEqual(keys, {f"{self.alice.id}_{self.bob.id}"})
+
+    def test_pages_backwards_from_newest(self):
+        response = self.client.get(self.url, {"page_size": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [m["content"] for m in response.data["results"]],
+            ["msg 4", "msg 3", "msg 2"],
+        )
+        response = self.client.get(response.data["next"])
+        self.assertEqual(
+            [m["content"] for m in response.data["results"]], ["msg 1", "msg 0"]
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_conditional_get_reads_conversation_row_only(self):
+        cache.clear()
+        record_message(Message.objects.filter(recipient=self.bob).last())
+        etag = self.client.get(self.url)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertIn("user_messages_conversation", queries[0]["sql"])
+        self.assertNotIn("COUNT", queries[0]["sql"])
+
+        mark_read(self.bob.id, self.alice.id, Message.objects.latest("id").id)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_thread_etag_follows_cards_and_deletions(self):
+        record_message(Message.objects.filter(recipient=self.bob).last())
+        etag = self.client.get(self.url)["ETag"]
+        self.bob.username = "thread_bob_renamed"
+        self.bob.save(update_fields=["username"])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "thread_bob_renamed",
+            {m["sender_username"] for m in response.data["results"]},
+        )
+
+        etag = response["ETag"]
+        Message.objects.filter(recipient=self.bob).earliest("id").delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_thread_query_uses_thread_index(self):
+        plan = (
+            Message.objects.filter(
+                conversation_key=conversation_key(self.alice.id, self.bob.id)
+            )
+            .order_by("-created_at", "-id")[:20]
+            .explain()
+        )
+        self.assertIn("message_thread_idx", plan)
+
+
+class ReadReceiptTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = CustomUser.objects.create_user(
+            username="receipt_alice", password="pass1234"
+        )
+        self.bob = CustomUser.objects.create_user(
+            username="receipt_bob", password="pass1234"
+        )
+        self.messages = []
+        for number in range(3):
+            message = Message.objects.create(
+                sender=self.bob, recipient=self.alice, content=f"msg {number}"
+            )
+            record_message(message)
+            self.messages.append(message)
+        self.reply = Message.objects.create(
+            sender=self.alice, recipient=self.bob, content="reply"
+        )
+        record_message(self.reply)
+        self.client.force_authenticate(user=self.alice)
+        self.url = reverse("message-read", kwargs={"user_id": self.bob.id})
+
+    def unread(self):
+        conversation = Conversation.objects.get()
+        return conversation.unread_low, conversation.unread_high
+
+    def test_marks_thread_read_up_to_id(self):
+        self.assertEqual(self.unread(), (3, 1))
+        response = self.client.post(
+            self.url, {"last_read_id": self.messages[1].id}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["marked_read"], 2)
+        self.assertEqual(
+            list(Message.objects.order_by("id").values_list("is_read", flat=True)),
+            [True, True, False, False],
+        )
+        self.assertEqual(self.unread(), (1, 1))
+
+        response = self.client.post(
+            self.url, {"last_read_id": self.reply.id}, format="json"
+        )
+        self.assertEqual(response.data["marked_read"], 1)
+        # Alice's own message stays unread for Bob.
+        self.assertFalse(Message.objects.get(pk=self.reply.pk).is_read)
+        self.assertEqual(self.unread(), (0, 1))
+
+    @override_settings(SHARED_CACHE=True)
+    def test_receipt_changes_both_message_list_etags(self):
+        list_url = reverse("message-list")
+        self.client.force_authenticate(user=self.bob)
+        etag = self.client.get(list_url)["ETag"]
+        response = self.client.get(list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        mark_read(self.alice.id, self.bob.id, self.messages[-1].id)
+        response = self.client.get(list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_repeated_receipts_are_coalesced(self):
+        mark_read(self.alice.id, self.bob.id, self.messages[2].id)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                mark_read(self.alice.id, self.bob.id, self.messages[1].id), 0
+            )
+            self.assertEqual(
+                mark_read(self.alice.id, self.bob.id, self.messages[2].id), 0
+            )
+
+    def test_receipt_is_pushed_to_chat_room(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(
+            f"chat_{conversation_key(self.alice.id, self.bob.id)}", channel
+        )
+        self.client.post(self.url, {"last_read_id": self.messages[0].id}, format="json")
+        event = async_to_sync(layer.receive)(channel)
+        self.assertEqual(event["type"], "chat.receipt")
+        self.assertEqual(event["reader"], self.alice.id)
+        self.assertEqual(event["last_read_id"], self.messages[0].id)
+
+    def test_rejects_invalid_id(self):
+        response = self.client.post(self.url, {"last_read_id": 0}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class PresenceTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.sender = CustomUser.objects.create_user(
+            username="presence_sender", password="pass1234"
+        )
+        self.recipient = CustomUser.objects.create_user(
+            username="presence_recipient", password="pass1234"
+        )
+        self.client.force_authenticate(user=self.sender)
+
+    def test_counts_open_sockets(self):
+        async_to_sync(presence.connect)(self.recipient.id)
+        async_to_sync(presence.connect)(self.recipient.id)
+        self.assertEqual(
+            presence.online_user_ids([self.recipient.id]), {self.recipient.id}
+        )
+        async_to_sync(presence.disconnect)(self.recipient.id)
+        self.assertTrue(presence.online_user_ids([self.recipient.id]))
+        async_to_sync(presence.disconnect)(self.recipient.id)
+        self.assertEqual(presence.online_user_ids([self.recipient.id]), set())
+
+    @override_settings(PRESENCE_SKIP_OFFLINE=True)
+    def test_skips_publishing_to_offline_users(self):
+        url = reverse("message-send", kwargs={"user_id": self.recipient.id})
+        with (
+            mock.patch("messages.views.get_channel_layer") as chat_layer,
+            mock.patch("notifications.views.get_channel_layer") as notification_layer,
+        ):
+            for layer in (chat_layer, notification_layer):
+                layer.return_value.group_send = mock.AsyncMock()
+            self.client.post(url, {"content": "anyone there?"}, format="multipart")
+            chat_layer.assert_not_called()
+            notification_layer.assert_not_called()
+
+            async_to_sync(presence.connect)(self.recipient.id)
+            self.client.post(url, {"content": "hello"}, format="multipart")
+            chat_layer.return_value.group_send.assert_awaited_once()
+            notification_layer.return_value.group_send.assert_awaited_once()
+
+    def test_heartbeat_after_eviction_counts_every_socket(self):
+        # Two sockets whose heartbeats both find the key gone both count again.
+        with mock.patch.object(cache, "atouch", mock.AsyncMock(return_value=False)):
+            async_to_sync(presence.heartbeat)(self.recipient.id)
+            async_to_sync(presence.heartbeat)(self.recipient.id)
+        self.assertEqual(cache.get(presence.presence_key(self.recipient.id)), 2)
+
+    def test_presence_endpoint(self):
+        Follow.objects.create(follower=self.sender, following=self.recipient)
+        async_to_sync(presence.connect)(self.recipient.id)
+        response = self.client.get(
+            reverse("presence"), {"ids": f"{self.sender.id},{self.recipient.id}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["online"], [self.recipient.id])
+        response = self.client.get(reverse("presence"), {"ids": "1,x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_presence_limited_to_followed_and_conversation_partners(self):
+        stranger = CustomUser.objects.create_user(username="presence_stranger")
+        for user in (self.recipient, stranger):
+            async_to_sync(presence.connect)(user.id)
+        ids = {"ids": f"{self.recipient.id},{stranger.id}"}
+        self.assertEqual(self.client.get(reverse("presence"), ids).data["online"], [])
+        record_message(
+            Message.objects.create(sender=self.recipient, recipient=self.sender)
+        )
+        response = self.client.get(reverse("presence"), ids)
+        self.assertEqual(response.data["online"], [self.recipient.id])
+
+
+class MessageSearchTests(APITestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(
+            username="search_alice", password="pass1234"
+        )
+        self.bob = CustomUser.objects.create_user(
+            username="search_bob", password="pass1234"
+        )
+        self.carol = CustomUser.objects.create_user(
+            username="search_carol", password="pass1234"
+        )
+        self.lunch = Message.objects.create(
+            sender=self.alice, recipient=self.bob, content="Lunch at the café?"
+        )
+        self.lunch_twice = Message.objects.create(
+            sender=self.bob, recipient=self.alice, content="lunch lunch lunch"
+        )
+        Message.objects.create(
+            sender=self.bob, recipient=self.carol, content="lunch without alice"
+        )
+        self.client.force_authenticate(user=self.alice)
+        self.url = reverse("message-search")
+
+    def search(self, q, **params):
+        response = self.client.get(self.url, {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_only_own_conversations_ranked(self):
+        results = self.search("lunch").data["results"]
+        self.assertEqual(
+            [m["id"] for m in results], [self.lunch_twice.id, self.lunch.id]
+        )
+        self.assertEqual(results[0]["sender_username"], "search_bob")
+
+    def test_prefix_and_diacritics(self):
+        results = self.search("lun cafe").data["results"]
+        self.assertEqual([m["id"] for m in results], [self.lunch.id])
+        self.assertEqual(self.search("...").data["results"], [])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.lunch.content = "Dinner instead"
+        self.lunch.save()
+        self.assertEqual(
+            [m["id"] for m in self.search("dinner").data["results"]], [self.lunch.id]
+        )
+        self.lunch.delete()
+        self.assertEqual(self.search("dinner").data["results"], [])
+
+    def test_pagination(self):
+        with mock.patch.object(MessageSearchView, "page_size", 1):
+            response = self.search("lunch")
+            self.assertEqual(len(response.data["results"]), 1)
+            response = self.client.get(response.data["next"])
+            self.assertEqual(
+                [m["id"] for m in response.data["results"]], [self.lunch.id]
+            )
+            self.assertIsNone(response.data["next"])
+        response = self.client.get(self.url, {"q": "lunch", "page": "two"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_search_uses_index(self):
+        admin_user = CustomUser.objects.create_superuser(
+            username="search_admin", password="pass1234", email="admin@example.com"
+        )
+        self.client.force_login(admin_user)
+        url = reverse("admin:user_messages_message_changelist")
+        response = self.client.get(url, {"q": "without"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_count, 1)
+        response = self.client.get(url, {"q": "search_carol"})
+        self.assertEqual(response.context["cl"].result_count, 1)
+        # Every match is counted, not a ranked page of the index.
+        Message.objects.bulk_create(
+            Message(
+                sender=self.bob,
+                recipient=self.carol,
+                conversation_key=conversation_key(self.bob.id, self.carol.id),
+                content="lunch again",
+            )
+            for _ in range(30)
+        )
+        response = self.client.get(url, {"q": "lunch"})
+        self.assertEqual(response.context["cl"].result_count, 33)
@@ -1,9 +1,19 @@
 from django.urls import path
 
-from .views import MessageListView, MessageSendView
+from .views import (
+    ConversationListView,
+    MessageListView,
+    MessageReadView,
+    MessageSearchView,
+    MessageSendView,
+    MessageThreadView,
+)
 
 urlpatterns = [
     path("", MessageListView.as_view(), name="message-list"),
+    path("inbox/", ConversationListView.as_view(), name="message-inbox"),
+    path("search/", MessageSearchView.as_view(), name="message-search"),
+    path("read/<int:user_id>/", MessageReadView.as_view(), name="message-read"),
     path("send/<int:user_id>/", MessageSendView.as_view(), name="message-send"),
-    path("with/<int:user_id>/", MessageListView.as_view(), name="message-thread"),
+    path("with/<int:user_id>/", MessageThreadView.as_view(), name="message-thread"),
 ]
@@ -1,57 +1,123 @@
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.db import transaction
 from django.db.models import Q
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
 from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
+from fido_web.conditional import (
+    conditional_get,
+    read_state_key,
+    read_state_validator,
+    state_version,
+)
+from fido_web.pagination import KeysetPagination
+from fido_web.presence import has_listeners
 from notifications.models import Notification
 from notifications.views import send_realtime_notification
 
-from .models import Message
-from .serializers import MessageSerializer
+from .conversations import inbox_for, mark_read, ordered_pair, record_message
+from .models import Conversation, Message, conversation_key
+from .search import search_messages
+from .serializers import (
+    ConversationSerializer,
+    MessageSerializer,
+    ReadReceiptSerializer,
+    message_payload,
+)
 
 
 def send_realtime_message(message):
-    channel_layer = get_channel_layer()
-    group_name = f"chat_{message.sender.id}_{message.recipient.id}"
-    media = {}
-
-    if hasattr(message, "image") and message.image:
-        media["image"] = message.image.url
-    if hasattr(message, "video") and message.video:
-        media["video"] = message.video.url
-    async_to_sync(channel_layer.group_send)(
-        group_name,
+    if not has_listeners([message.sender_id, message.recipient_id]):
+        return
+    async_to_sync(get_channel_layer().group_send)(
+        f"chat_{message.conversation_key}",
         {
             "type": "chat.message",
-            "message": {
-                "id": message.id,
-                "sender": message.sender.username,
-                "recipient": message.recipient.username,
-                "content": message.content,
-                "created_at": message.created_at.isoformat(),
-                **media,
-            },
+            "message": message_payload(
+                message, message.sender.username, message.recipient.username
+            ),
         },
     )
 
 
+def send_read_receipt(reader_id, other_id, last_read_id):
+    if not has_listeners([other_id]):
+        return
+    async_to_sync(get_channel_layer().group_send)(
+        f"chat_{conversation_key(reader_id, other_id)}",
+        {"type": "chat.receipt", "reader": reader_id, "last_read_id": last_read_id},
+    )
+
+
+def thread_validator(view, request, user_id):
+    """
+    The pair's Conversation row: its newest message and both unread counters
+    move on every new message and read receipt in the thread, the two users'
+    ``card_version`` on every card change. Edits and deletions of older
+    messages move the read-state version instead.
+    """
+    version = state_version(read_state_key(view.read_state_scope, request.user.id))
+    if version is None:
+        return None
+    low, high = ordered_pair(request.user.id, user_id)
+    conversation = (
+        Conversation.objects.filter(user_low_id=low, user_high_id=high)
+        .values_list(
+            "last_message_id",
+            "unread_low",
+            "unread_high",
+            "user_low__card_version",
+            "user_high__card_version",
+        )
+        .first()
+    )
+    if conversation is None:
+        return None
+    return conversation, version
+
+
+class ThreadPagination(KeysetPagination):
+    """Pages backwards from the newest message of a thread."""
+
+    page_size = 50
+
+
 class MessageListView(generics.ListAPIView):
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    read_state_scope = "messages"
+    card_user_fields = ("sender", "recipient")
 
     def get_queryset(self):
         user = self.request.user
-        other_user_id = self.kwargs.get("user_id")
-        if other_user_id:
-            return Message.objects.filter(
-                (Q(sender=user) & Q(recipient_id=other_user_id))
-                | (Q(sender_id=other_user_id) & Q(recipient=user))
-            ).order_by("created_at")
         return Message.objects.filter(Q(sender=user) | Q(recipient=user)).order_by(
             "-created_at"
         )
 
+    @conditional_get(read_state_validator)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+
+class MessageThreadView(MessageListView):
+    """Messages between the user and ``user_id``, newest first."""
+
+    pagination_class = ThreadPagination
+
+    def get_queryset(self):
+        return Message.objects.filter(
+            conversation_key=conversation_key(
+                self.request.user.id, self.kwargs["user_id"]
+            )
+        )
+
+    @conditional_get(thread_validator)
+    def get(self, request, *args, **kwargs):
+        return super(MessageListView, self).get(request, *args, **kwargs)
+
 
 class MessageSendView(generics.CreateAPIView):
     serializer_class = MessageSerializer
@@ -65,7 +131,9 @@ class MessageSendView(generics.CreateAPIView):
             from users.models import CustomUser
 
             recipient = CustomUser.objects.get(pk=recipient_id)
-        serializer.save(sender=self.request.user, recipient=recipient)
+        with transaction.atomic():
+            message = serializer.save(sender=self.request.user, recipient=recipient)
+            record_message(message)
         # Notification for receiving a message
         if recipient and recipient != self.request.user:
             notification = Notification.objects.create(
@@ -76,10 +144,67 @@ class MessageSendView(generics.CreateAPIView):
             )
             send_realtime_notification(notification)
             # Real-time chat message
-            last_message = (
-                Message.objects.filter(sender=self.request.user, recipient=recipient)
-                .order_by("-created_at")
-                .first()
+            send_realtime_message(message)
+
+
+class MessageReadView(generics.GenericAPIView):
+    """Read receipt: everything ``user_id`` sent up to ``last_read_id`` is read."""
+
+    serializer_class = ReadReceiptSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, user_id):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        last_read_id = serializer.validated_data["last_read_id"]
+        marked = mark_read(request.user.id, user_id, last_read_id)
+        if marked:
+            send_read_receipt(request.user.id, user_id, last_read_id)
+        return Response({"marked_read": marked})
+
+
+class InboxPagination(KeysetPagination):
+    ordering_field = "last_activity"
+
+
+class ConversationListView(generics.ListAPIView):
+    """The user's conversations, most recently active first."""
+
+    serializer_class = ConversationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = InboxPagination
+
+    def get_queryset(self):
+        return inbox_for(self.request.user)
+
+
+class MessageSearchView(generics.GenericAPIView):
+    """The user's messages matching ``q``, best match first, ``page`` by ``page``."""
+
+    serializer_class = MessageSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    page_size = 20
+    max_page = 50
+
+    def get(self, request):
+        try:
+            page = max(1, min(int(request.query_params.get("page", 1)), self.max_page))
+        except ValueError:
+            return Response(
+                {"message": "page must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # One extra row tells whether there is a next page.
+        messages = search_messages(
+            request.user,
+            request.query_params.get("q", ""),
+            limit=self.page_size + 1,
+            offset=(page - 1) * self.page_size,
+        )
+        next_url = None
+        if len(messages) > self.page_size and page < self.max_page:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), "page", page + 1
             )
-            if last_message:
-                send_realtime_message(last_message)
+        serializer = self.get_serializer(messages[: self.page_size], many=True)
+        return Response({"next": next_url, "results": serializer.data})
@@ -1,20 +1,33 @@
-import json
-
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from fido_web.presence import PresenceMixin
+from fido_web.replay import ReplayMixin
+from fido_web.socket_codec import FrameCodecMixin
 from notifications.models import Notification
 from notifications.serializers import NotificationSerializer
 
 
-class NotificationConsumer(AsyncWebsocketConsumer):
+class NotificationConsumer(
+    ReplayMixin, FrameCodecMixin, PresenceMixin, AsyncWebsocketConsumer
+):
     async def connect(self):
-        self.user_id = self.scope["url_route"]["kwargs"]["user_id"]
+        user = self.scope["user"]
+        self.user_id = int(self.scope["url_route"]["kwargs"]["user_id"])
+        # Only the recipient may listen, or replay would hand out their history.
+        if not user.is_authenticated or user.id != self.user_id:
+            await self.close()
+            return
         self.group_name = f"user_notifications_{self.user_id}"
         await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+        await self.join_presence(self.user_id)
+        await self.accept_negotiated()
+        await self.replay(self.load_missed_notifications)
 
     async def disconnect(self, close_code):
+        if not hasattr(self, "group_name"):
+            return
+        await self.leave_presence()
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def receive(self, text_data=None, bytes_data=None):
@@ -23,7 +36,8 @@ class NotificationConsumer(AsyncWebsocketConsumer):
 
     async def send_notification(self, event):
         notification = event["notification"]
-        await self.send(text_data=json.dumps(notification))
+        if not self.already_replayed(notification["id"]):
+            await self.send_event(notification)
 
     @database_sync_to_async
     def get_unread_notifications(self):
@@ -31,3 +45,9 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             recipient_id=self.user_id, is_read=False
         )
         return NotificationSerializer(notifications, many=True).data
+
+    def load_missed_notifications(self, since, limit):
+        notifications = Notification.objects.filter(
+            recipient_id=self.user_id, id__gt=since
+        ).order_by("id")[:limit]
+        return NotificationSerializer(notifications, many=True).data
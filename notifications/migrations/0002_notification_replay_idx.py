@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-19 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["recipient", "id"], name="notification_replay_idx"
+            ),
+        ),
+    ]
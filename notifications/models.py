@@ -1,5 +1,6 @@
 from django.db import models
 
+from fido_web.conditional import bump_read_state
 from posts.models import Comment, Post
 from users.models import CustomUser
 
@@ -26,5 +27,22 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Socket replay: a recipient's notifications after a given id.
+            models.Index(fields=["recipient", "id"], name="notification_replay_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        # New rows move the newest id; only updates need the version bumped.
+        updating = not self._state.adding
+        super().save(*args, **kwargs)
+        if updating:
+            bump_read_state("notifications", self.recipient_id)
+
+    def delete(self, *args, **kwargs):
+        bump_read_state("notifications", self.recipient_id)
+        return super().delete(*args, **kwargs)
+
     def __str__(self):
         return f"To {self.recipient.username}: {self.message}"
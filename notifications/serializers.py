@@ -1,13 +1,13 @@
 from rest_framework import serializers
 
+from users.serializers import UserCardField, UserCardListSerializer, UserCardsMixin
+
 from .models import Notification
 
 
-class NotificationSerializer(serializers.ModelSerializer):
-    sender_username = serializers.CharField(source="sender.username", read_only=True)
-    recipient_username = serializers.CharField(
-        source="recipient.username", read_only=True
-    )
+class NotificationSerializer(UserCardsMixin, serializers.ModelSerializer):
+    sender_username = UserCardField(source="sender_id", card_field="username")
+    recipient_username = UserCardField(source="recipient_id", card_field="username")
 
     class Meta:
         model = Notification
@@ -34,3 +34,4 @@ class NotificationSerializer(serializers.ModelSerializer):
             "comment",
             "message",
         ]
+        list_serializer_class = UserCardListSerializer
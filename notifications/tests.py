@@ -1,4 +1,6 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 
@@ -42,3 +44,49 @@ class NotificationSystemTestCase(TestCase):
         ).first()
         self.assertIsNotNone(notif)
         self.assertIn("replied to your comment", notif.message)
+
+
+@override_settings(SHARED_CACHE=True)
+class NotificationConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = CustomUser.objects.create_user(username="poller", password="pass")
+        self.other = CustomUser.objects.create_user(username="liker", password="pass")
+        self.notification = Notification.objects.create(
+            recipient=self.user,
+            sender=self.other,
+            notification_type="like",
+            message="liker liked your post.",
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("notification-list")
+
+    def test_not_modified_until_list_changes(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        self.assertIn("Authorization", response["Vary"])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("COUNT", queries[0]["sql"])
+
+        self.notification.is_read = True
+        self.notification.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_changes_when_sender_card_changes(self):
+        etag = self.client.get(self.url)["ETag"]
+        self.other.username = "liker_renamed"
+        self.other.save(update_fields=["username"])
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["sender_username"], "liker_renamed")
+
+    @override_settings(SHARED_CACHE=False)
+    def test_no_etag_without_shared_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
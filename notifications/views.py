@@ -2,6 +2,9 @@ from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
 from rest_framework import generics, permissions
 
+from fido_web.conditional import conditional_get, read_state_validator
+from fido_web.presence import has_listeners
+
 from .models import Notification
 from .serializers import NotificationSerializer
 
@@ -9,12 +12,18 @@ from .serializers import NotificationSerializer
 class NotificationListView(generics.ListAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    read_state_scope = "notifications"
+    card_user_fields = ("sender", "recipient")
 
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user).order_by(
             "-created_at"
         )
 
+    @conditional_get(read_state_validator)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
 class NotificationMarkReadView(generics.UpdateAPIView):
     serializer_class = NotificationSerializer
@@ -26,6 +35,8 @@ class NotificationMarkReadView(generics.UpdateAPIView):
 
 
 def send_realtime_notification(notification):
+    if not has_listeners([notification.recipient_id]):
+        return
     channel_layer = get_channel_layer()
     group_name = f"user_notifications_{notification.recipient.id}"
     from notifications.serializers import NotificationSerializer
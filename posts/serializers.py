@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from users.serializers import UserCardField, UserCardListSerializer, UserCardsMixin
+
 from .models import Comment, Post, PostMedia, Tag
 
 
@@ -86,8 +88,8 @@ class PostSerializer(serializers.ModelSerializer):
         post.tags.set(tag_objs)
 
 
-class CommentSerializer(serializers.ModelSerializer):
-    user = serializers.StringRelatedField(read_only=True)
+class CommentSerializer(UserCardsMixin, serializers.ModelSerializer):
+    user = UserCardField(source="user_id", card_field="username")
     parent = serializers.PrimaryKeyRelatedField(
         queryset=Comment.objects.all(), required=False, allow_null=True
     )
@@ -98,6 +100,7 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ["id", "user", "post", "content", "created_at", "parent", "mentions"]
         read_only_fields = ["id", "user", "created_at", "mentions", "post"]
+        list_serializer_class = UserCardListSerializer
 
     def get_mentions(self, obj):
         import re
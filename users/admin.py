@@ -1,8 +1,20 @@
 from django.contrib import admin
 
-from .models import CustomUser, Follow, CoinClaimHistory
+from .models import CustomUser, Follow, FollowSuggestion, CoinClaimHistory, CoinWallet
 
 # Register your models here.
 admin.site.register(CustomUser)
 admin.site.register(Follow)
 admin.site.register(CoinClaimHistory)
+
+
+@admin.register(FollowSuggestion)
+class FollowSuggestionAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "suggested", "mutual_count", "rank", "created_at")
+    raw_id_fields = ("user", "suggested")
+
+
+@admin.register(CoinWallet)
+class CoinWalletAdmin(admin.ModelAdmin):
+    list_display = ("user", "balance", "last_claimed", "updated_at")
+    raw_id_fields = ("user",)
@@ -0,0 +1,105 @@
+"""
+JWT authentication that resolves ``request.user`` without a query per request.
+
+The few columns authentication needs (AUTH_FIELDS) are kept per process for
+AUTH_USER_CACHE_TTL seconds and turned back into a CustomUser with every
+other field deferred. Views that only use ``request.user.pk`` therefore run
+no auth query at all; the first access to any other field loads the rest of
+the row in one query (see CustomUser.refresh_from_db).
+
+CustomUser.save() and delete() drop the entry in the current process, which
+covers password changes and deactivation. Other processes pick the change up
+once their entry expires, so keep the TTL short. Saving a cached user never
+writes its unchanged AUTH_FIELDS, which may be older than the row.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+AUTH_FIELDS = ("id", "username", "password", "is_active", "is_staff", "is_superuser")
+AUTH_CACHE_MAX_USERS = 10000
+
+_users = {}
+_lock = threading.Lock()
+
+
+def _ttl():
+    return getattr(settings, "AUTH_USER_CACHE_TTL", 30)
+
+
+def loaded_fields(model):
+    """AUTH_FIELDS in concrete field order, as Model.from_db() expects them."""
+    return [f.attname for f in model._meta.concrete_fields if f.attname in AUTH_FIELDS]
+
+
+def get_cached_auth_user(model, user_id):
+    entry = _users.get(user_id)
+    if entry is None:
+        return None
+    expires_at, values = entry
+    if expires_at < time.monotonic():
+        invalidate_auth_user(user_id)
+        return None
+    fields = loaded_fields(model)
+    user = model.from_db(DEFAULT_DB_ALIAS, fields, values)
+    # CustomUser.save() compares against this so the possibly stale cached
+    # values are never written back, only the ones a view assigned.
+    user._auth_snapshot = dict(zip(fields, values))
+    return user
+
+
+def cache_auth_user(user):
+    values = tuple(getattr(user, field) for field in loaded_fields(type(user)))
+    with _lock:
+        if len(_users) >= AUTH_CACHE_MAX_USERS:
+            _users.clear()
+        _users[user.pk] = (time.monotonic() + _ttl(), values)
+
+
+def invalidate_auth_user(user_id):
+    with _lock:
+        _users.pop(user_id, None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_auth_user(self.user_model, user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.only(*AUTH_FIELDS).get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache_auth_user(user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    target_class = "users.authentication.CachedJWTAuthentication"
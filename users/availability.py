@@ -0,0 +1,167 @@
+"""
+"Is this username / email taken?" answered mostly from memory.
+
+Each process keeps a Bloom filter per field. A miss means the value is
+definitely free and costs no query; a hit may be a false positive (about 1%)
+and is confirmed with an ``exists()`` lookup. Registrations in this process
+are added right away.
+
+The filters are maintained by a daemon thread, started by the first lookup,
+so no request ever scans the user table. It builds them from one streamed
+scan, picks up users registered by other processes with a cheap primary-key
+range scan every CATCH_UP_INTERVAL seconds, and every REBUILD_INTERVAL
+seconds builds fresh filters, to forget deleted or renamed accounts, and
+swaps them in. Until the first build is done lookups query the table.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("username", "email")
+ERROR_RATE = 0.01
+MIN_CAPACITY = 10000
+SCAN_CHUNK_SIZE = 5000
+CATCH_UP_INTERVAL = 5
+REBUILD_INTERVAL = 60 * 60
+# Ids below the highest one seen may still commit late; rescan this many.
+CATCH_UP_OVERLAP = 1000
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.capacity = max(capacity, 1)
+        self.size = max(
+            64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing: k positions from the two halves of one digest.
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class TakenFilters:
+    """One generation of filters and the highest user id they have seen."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.filters = {field: BloomFilter(capacity) for field in FIELDS}
+        self.added = 0
+        self.last_id = 0
+
+    def add_rows(self, rows):
+        for user_id, *values in rows:
+            for field, value in zip(FIELDS, values):
+                if value:
+                    self.filters[field].add(value)
+            if user_id > self.last_id:
+                self.added += 1
+                self.last_id = user_id
+
+
+class TakenIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._worker = None
+        self.reset()
+
+    def reset(self):
+        self.current = None
+        self.built_at = 0.0
+
+    def start(self):
+        """Start the maintenance thread once per process."""
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="taken-index", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.maintain()
+            except Exception:
+                logger.warning("Could not refresh the taken index", exc_info=True)
+            finally:
+                close_old_connections()
+            time.sleep(CATCH_UP_INTERVAL)
+
+    def _scan(self, after_id):
+        return (
+            get_user_model()
+            .objects.filter(id__gt=after_id)
+            .order_by("id")
+            .values_list("id", *FIELDS)
+            .iterator(chunk_size=SCAN_CHUNK_SIZE)
+        )
+
+    def maintain(self):
+        current = self.current
+        if (
+            current is None
+            or time.monotonic() - self.built_at > REBUILD_INTERVAL
+            or current.added > current.capacity
+        ):
+            self.rebuild()
+        else:
+            self.catch_up()
+
+    def rebuild(self):
+        """Build new filters off to the side, then swap them in."""
+        built_at = time.monotonic()
+        # Room to double before the false-positive rate starts to climb.
+        capacity = max(get_user_model().objects.count() * 2, MIN_CAPACITY)
+        filters = TakenFilters(capacity)
+        filters.add_rows(self._scan(0))
+        with self._lock:
+            self.current = filters
+            self.built_at = built_at
+        # Registrations added to the old filters during the scan.
+        self.catch_up()
+
+    def catch_up(self):
+        current = self.current
+        rows = list(self._scan(max(current.last_id - CATCH_UP_OVERLAP, 0)))
+        with self._lock:
+            current.add_rows(rows)
+
+    def add(self, user):
+        with self._lock:
+            if self.current is not None:
+                self.current.add_rows([(user.pk, *(getattr(user, f) for f in FIELDS))])
+
+    def is_taken(self, field, value):
+        self.start()
+        current = self.current
+        if current is not None and value not in current.filters[field]:
+            return False
+        return get_user_model().objects.filter(**{field: value}).exists()
+
+
+taken_index = TakenIndex()
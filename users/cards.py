@@ -0,0 +1,56 @@
+"""
+Cached "user cards": the few user fields every listing shows next to a person.
+
+Cards live in the default cache under a versioned key and are dropped whenever
+CustomUser.save() touches one of CARD_FIELDS. Bump CARD_VERSION when the card
+shape changes so stale entries are never read back. The same saves increment
+the user's ``card_version`` column, which ETags of responses that embed cards
+read for the users they list.
+
+Cards are only cached when SHARED_CACHE is set (settings turn it on with
+REDIS_CACHE_URL); a per-process cache would keep serving a card another worker
+has changed, so without one every lookup reads the database.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+CARD_FIELDS = ("id", "username", "first_name", "last_name", "avatar_sm")
+CARD_VERSION = 1
+CARD_TTL = 60 * 60
+
+
+def card_key(user_id):
+    return f"user_card:{user_id}"
+
+
+def get_user_cards(user_ids):
+    """Return ``{user_id: card}`` for ``user_ids`` with one cache round trip."""
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if not user_ids:
+        return {}
+    if not getattr(settings, "SHARED_CACHE", False):
+        return fetch_cards(user_ids)
+    keys = {card_key(user_id): user_id for user_id in user_ids}
+    cached = cache.get_many(keys, version=CARD_VERSION)
+    cards = {keys[key]: card for key, card in cached.items()}
+    missing = user_ids - cards.keys()
+    if missing:
+        fetched = fetch_cards(missing)
+        cache.set_many(
+            {card_key(user_id): card for user_id, card in fetched.items()},
+            timeout=CARD_TTL,
+            version=CARD_VERSION,
+        )
+        cards.update(fetched)
+    return cards
+
+
+def fetch_cards(user_ids):
+    users = get_user_model().objects.filter(id__in=user_ids)
+    return {row["id"]: row for row in users.values(*CARD_FIELDS)}
+
+
+def invalidate_user_card(user_id):
+    cache.delete(card_key(user_id), version=CARD_VERSION)
@@ -0,0 +1,87 @@
+"""
+Coin ledger.
+
+Balances live in CoinWallet rather than on CustomUser, so claims never touch
+the user row (or its save() side effects). A daily claim is one conditional
+UPDATE that only matches when the wallet has not been credited today, plus
+the CoinClaimHistory insert, in a single transaction; concurrent claims
+cannot double-credit.
+
+Every claim also bumps the user's CoinRollup rows for its day, week and
+month, so period summaries are read directly instead of summed from history.
+"""
+
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import CoinClaimHistory, CoinRollup, CoinWallet
+
+DAILY_CLAIM_AMOUNT = 10
+
+
+def get_balance(user_id):
+    balance = (
+        CoinWallet.objects.filter(user_id=user_id)
+        .values_list("balance", flat=True)
+        .first()
+    )
+    return balance or 0
+
+
+def claim_daily_coins(user_id, amount=DAILY_CLAIM_AMOUNT):
+    """Credit today's claim and return the new balance, or None if already claimed."""
+    today = timezone.now().date()
+    with transaction.atomic():
+        credited = (
+            CoinWallet.objects.filter(user_id=user_id)
+            .filter(Q(last_claimed__lt=today) | Q(last_claimed__isnull=True))
+            .update(balance=F("balance") + amount, last_claimed=today)
+        )
+        if not credited:
+            # Either no wallet yet, or today's claim is already in. Creating
+            # the wallet tells the two apart: the primary key rejects it if it
+            # exists, including when a concurrent first claim got there first.
+            try:
+                with transaction.atomic():
+                    CoinWallet.objects.create(
+                        user_id=user_id, balance=amount, last_claimed=today
+                    )
+            except IntegrityError:
+                return None
+        CoinClaimHistory.objects.create(user_id=user_id, amount=amount)
+        add_to_rollups(user_id, amount, today)
+        return get_balance(user_id)
+
+
+def period_starts(day):
+    """``{period: first day of the period containing day}``; weeks start Monday."""
+    return {
+        CoinRollup.DAY: day,
+        CoinRollup.WEEK: day - timedelta(days=day.weekday()),
+        CoinRollup.MONTH: day.replace(day=1),
+    }
+
+
+def add_to_rollups(user_id, amount, day):
+    """Add one claim of ``amount`` to the rollups covering ``day``."""
+    for period, start in period_starts(day).items():
+        rollup = CoinRollup.objects.filter(
+            user_id=user_id, period=period, period_start=start
+        )
+        if rollup.update(total=F("total") + amount, claims=F("claims") + 1):
+            continue
+        try:
+            with transaction.atomic():
+                CoinRollup.objects.create(
+                    user_id=user_id,
+                    period=period,
+                    period_start=start,
+                    total=amount,
+                    claims=1,
+                )
+        except IntegrityError:
+            # Created by a concurrent claim in between; add to it instead.
+            rollup.update(total=F("total") + amount, claims=F("claims") + 1)
@@ -0,0 +1,256 @@
+import json
+import platform
+import resource
+import statistics
+import time
+import tracemalloc
+from io import BytesIO
+
+import PIL
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from media_utils import (
+    ImageVariantMixin,
+    LatencyMediaStorage,
+    media_storage_override,
+)
+
+METRIC_NOTES = {
+    "peak_python_bytes": (
+        "tracemalloc peak of one generate_variants call; counts Python "
+        "allocations only, not Pillow's C image buffers."
+    ),
+    "process_peak_rss_kb": (
+        "ru_maxrss of the whole benchmark process so far; it never goes down, "
+        "so later cases repeat or exceed the largest earlier peak."
+    ),
+}
+
+# (name, format, mode, width, height)
+CASES = [
+    ("jpeg_rgb_photo", "JPEG", "RGB", 1600, 1200),
+    ("jpeg_rgb_12mp", "JPEG", "RGB", 4032, 3024),
+    ("jpeg_grayscale", "JPEG", "L", 1024, 768),
+    ("png_rgba_alpha", "PNG", "RGBA", 1024, 1024),
+    ("png_palette", "PNG", "P", 800, 600),
+    ("jpeg_panorama", "JPEG", "RGB", 12000, 2000),
+]
+
+
+def synthetic_image(fmt, mode, width, height):
+    """Encode a noisy gradient so compression behaves like a real photo."""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 48)
+    if mode == "L":
+        img = Image.blend(gradient, noise, 0.3)
+    else:
+        img = Image.merge(
+            "RGB", (noise, gradient, gradient.transpose(Image.FLIP_LEFT_RIGHT))
+        )
+        if mode == "RGBA":
+            img.putalpha(gradient.rotate(90, expand=False))
+        elif mode == "P":
+            img = img.convert("P", palette=Image.ADAPTIVE)
+    buffer = BytesIO()
+    img.save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def time_stages(data, storage, base_path):
+    """Run the generate_variants steps one by one and time each of them."""
+    timings = {}
+    start = time.perf_counter()
+    img = Image.open(BytesIO(data))
+    img.load()
+    timings["decode_ms"] = elapsed_ms(start)
+    for key, size in ImageVariantMixin.VARIANTS.items():
+        start = time.perf_counter()
+        img_copy = img.copy()
+        img_copy.thumbnail(size, Image.LANCZOS)
+        resize_ms = elapsed_ms(start)
+        start = time.perf_counter()
+        buffer = BytesIO()
+        img_copy.save(buffer, format=img.format or "JPEG")
+        encode_ms = elapsed_ms(start)
+        start = time.perf_counter()
+        storage.save(f"{base_path}_{key}.bench", ContentFile(buffer.getvalue()))
+        timings[key] = {
+            "resize_ms": resize_ms,
+            "encode_ms": encode_ms,
+            "write_ms": elapsed_ms(start),
+            "bytes": buffer.tell(),
+        }
+    return timings
+
+
+def median_of(runs):
+    """Median of every numeric leaf across a list of identically shaped dicts."""
+    first = runs[0]
+    if isinstance(first, dict):
+        return {key: median_of([run[key] for run in runs]) for key in first}
+    return statistics.median(runs)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the image variant pipeline and write the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Simulated storage round trip in seconds.",
+        )
+        parser.add_argument("--jitter", type=float, default=0.0)
+        parser.add_argument(
+            "--quick",
+            action="store_true",
+            help="Shrink every case 4x for a fast smoke run.",
+        )
+        parser.add_argument("--case", action="append", dest="cases")
+        parser.add_argument("--output", help="Write the JSON results to this file.")
+        parser.add_argument(
+            "--compare", help="Baseline JSON file to check the results against."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.25,
+            help="Allowed slowdown against the baseline, as a fraction.",
+        )
+
+    def handle(self, *args, **options):
+        cases = [case for case in CASES if case[0] in (options["cases"] or [case[0]])]
+        if not cases:
+            raise CommandError("No benchmark case matches --case.")
+        results = {
+            "meta": {
+                "created_at": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "pillow": PIL.__version__,
+                "repeat": options["repeat"],
+                "latency": options["latency"],
+                "jitter": options["jitter"],
+                "quick": options["quick"],
+                "notes": METRIC_NOTES,
+            },
+            "cases": {},
+        }
+        for name, fmt, mode, width, height in cases:
+            if options["quick"]:
+                width, height = width // 4, height // 4
+            data = synthetic_image(fmt, mode, width, height)
+            # A fresh storage per case keeps in-memory files from piling up.
+            storage = LatencyMediaStorage(
+                latency=options["latency"], jitter=options["jitter"], seed=0
+            )
+            results["cases"][name] = {
+                "format": fmt,
+                "mode": mode,
+                "size": [width, height],
+                "bytes": len(data),
+                **self.run_case(data, fmt, storage, options["repeat"]),
+            }
+            self.stdout.write(
+                f"{name:<16} {width}x{height} {fmt}/{mode}: "
+                f"generate_variants {results['cases'][name]['generate_variants_ms']:.1f} ms"
+            )
+        for metric, note in METRIC_NOTES.items():
+            self.stdout.write(f"{metric}: {note}")
+
+        payload = json.dumps(results, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                f.write(payload)
+        else:
+            self.stdout.write(payload)
+        if options["compare"]:
+            self.compare(results, options["compare"], options["threshold"])
+
+    def run_case(self, data, fmt, storage, repeat):
+        stages = [time_stages(data, storage, f"bench/{i}/stage") for i in range(repeat)]
+        pipeline = [self.time_pipeline(data, fmt, storage, i) for i in range(repeat)]
+        storage_summary = storage.summary()
+
+        # Measured separately, tracemalloc slows every allocation down.
+        tracemalloc.start()
+        try:
+            ImageVariantMixin().generate_variants(
+                BytesIO(data), storage, "bench/memory/variants"
+            )
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            **median_of(stages),
+            **median_of(pipeline),
+            "peak_python_bytes": peak,
+            "process_peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "storage": storage_summary,
+        }
+
+    def time_pipeline(self, data, fmt, storage, run):
+        """Time generate_variants and both model save() paths against ``storage``."""
+        from posts.models import Post, PostMedia
+        from users.models import CustomUser
+
+        timings = {}
+        start = time.perf_counter()
+        ImageVariantMixin().generate_variants(
+            BytesIO(data), storage, f"bench/{run}/variants"
+        )
+        timings["generate_variants_ms"] = elapsed_ms(start)
+
+        avatar_field = CustomUser._meta.get_field("avatar")
+        file_field = PostMedia._meta.get_field("file")
+        with (
+            media_storage_override(storage, avatar_field, file_field),
+            transaction.atomic(),
+        ):
+            user = CustomUser(username=f"bench_media_{run}")
+            user.avatar = ContentFile(data, name=f"bench.{fmt.lower()}")
+            start = time.perf_counter()
+            user.save()
+            timings["user_save_ms"] = elapsed_ms(start)
+
+            post = Post.objects.create(user=user, content="benchmark")
+            media = PostMedia(
+                post=post, file=ContentFile(data, name=f"bench.{fmt.lower()}")
+            )
+            start = time.perf_counter()
+            media.save()
+            timings["post_media_save_ms"] = elapsed_ms(start)
+            # Benchmark rows never reach the database.
+            transaction.set_rollback(True)
+        return timings
+
+    def compare(self, results, baseline_path, threshold):
+        with open(baseline_path) as f:
+            baseline = json.load(f)["cases"]
+        regressions = []
+        for name, case in results["cases"].items():
+            if name not in baseline:
+                continue
+            for metric in (
+                "decode_ms",
+                "generate_variants_ms",
+                "user_save_ms",
+                "post_media_save_ms",
+            ):
+                before, after = baseline[name].get(metric), case[metric]
+                if before and after > before * (1 + threshold):
+                    regressions.append(
+                        f"{name}.{metric}: {before:.1f} ms -> {after:.1f} ms"
+                    )
+        if regressions:
+            raise CommandError("Media pipeline regressions:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.suggestions import rebuild_follow_suggestions
+
+
+class Command(BaseCommand):
+    help = "Recompute friends-of-friends follow suggestions for every user."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top", type=int, default=20, help="Suggestions kept per user."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Users whose suggestions are replaced per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        written = rebuild_follow_suggestions(
+            top_n=options["top"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Stored {written} suggestions in {time.perf_counter() - start:.1f}s."
+            )
+        )
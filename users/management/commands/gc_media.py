@@ -0,0 +1,108 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from media_utils import get_media_storage, iter_storage_files, storage_name_from_url
+
+# Directories written by CustomUser, PostMedia and Message uploads.
+MANAGED_PREFIXES = ("avatars", "post_media", "messages")
+REFERENCE_CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = "Delete media files that are no longer referenced by any model."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report orphaned files without deleting them.",
+        )
+        parser.add_argument(
+            "--grace-hours",
+            type=float,
+            default=24,
+            help="Keep orphans younger than this, e.g. uploads still in flight.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of files removed per delete call (max 1000).",
+        )
+        parser.add_argument(
+            "--prefix",
+            action="append",
+            dest="prefixes",
+            help="Only scan this directory. May be given more than once.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if not 0 < batch_size <= 1000:
+            raise CommandError("--batch-size must be between 1 and 1000.")
+        prefixes = options["prefixes"] or MANAGED_PREFIXES
+        dry_run = options["dry_run"]
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+
+        storage = get_media_storage()
+        referenced = self.referenced_names(storage)
+        self.stdout.write(f"{len(referenced)} referenced media files.")
+
+        scanned = orphaned = skipped = total_bytes = 0
+        batch = []
+        for prefix in prefixes:
+            for name in iter_storage_files(storage, prefix):
+                scanned += 1
+                if name in referenced:
+                    continue
+                if storage.get_modified_time(name) > cutoff:
+                    skipped += 1
+                    continue
+                orphaned += 1
+                if dry_run:
+                    size = storage.size(name)
+                    total_bytes += size
+                    self.stdout.write(f"  {name} ({size} bytes)")
+                    continue
+                batch.append(name)
+                if len(batch) >= batch_size:
+                    storage.delete_many(batch)
+                    batch = []
+        if batch:
+            storage.delete_many(batch)
+
+        if dry_run:
+            summary = (
+                f"Dry run: {orphaned} orphaned files ({total_bytes} bytes) "
+                f"out of {scanned} scanned"
+            )
+        else:
+            summary = f"Deleted {orphaned} orphaned files out of {scanned} scanned"
+        self.stdout.write(
+            self.style.SUCCESS(f"{summary}; {skipped} kept inside the grace period.")
+        )
+
+    def referenced_names(self, storage):
+        from messages.models import Message
+        from posts.models import PostMedia
+        from users.models import CustomUser
+
+        sources = [
+            (CustomUser, ["avatar"], ["avatar_sm", "avatar_md", "avatar_lg"]),
+            (PostMedia, ["file"], ["file_sm", "file_md", "file_lg"]),
+            (Message, ["image", "video"], []),
+        ]
+        referenced = set()
+        for model, file_fields, url_fields in sources:
+            rows = model.objects.values_list(*file_fields, *url_fields).iterator(
+                chunk_size=REFERENCE_CHUNK_SIZE
+            )
+            for row in rows:
+                referenced.update(name for name in row[: len(file_fields)] if name)
+                for url in row[len(file_fields) :]:
+                    name = storage_name_from_url(url, storage)
+                    if name:
+                        referenced.add(name)
+        return referenced
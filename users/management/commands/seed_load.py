@@ -0,0 +1,678 @@
+import argparse
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from messages.models import Conversation, Message, conversation_key
+from notifications.models import Notification
+from posts.models import Comment, CommentLike, Post, PostLike, Tag
+from users.coins import DAILY_CLAIM_AMOUNT
+from users.models import CoinWallet, CustomUser, Follow
+from users.search import normalize
+
+# Every (stage, batch) pair gets its own RNG stream, so for a given --seed and
+# --batch-size a batch draws the same numbers on every run. STAGE_WEIGHTS
+# streams hold the samplers that are shared by several batches.
+STAGE_WEIGHTS = 0
+STAGE_FOLLOWS = 1
+STAGE_USERS = 2
+STAGE_POSTS = 3
+STAGE_COMMENTS = 4
+STAGE_POST_LIKES = 5
+STAGE_COMMENT_LIKES = 6
+STAGE_MESSAGES = 7
+STAGE_NOTIFICATIONS = 8
+STAGE_WALLETS = 9
+
+WORDS = (
+    "hari ini kita makan pagi bareng teman kopi senja kota hujan jalan pulang "
+    "kerja libur pantai gunung musik film buku foto kucing anjing bola main "
+    "seru banget mantap keren lucu capek happy weekend vibes"
+).split()
+FIRST_NAMES = (
+    "Adi Budi Citra Dewi Eka Fajar Gita Hadi Indah Joko Kiki Lestari Maya "
+    "Nanda Oki Putri Rizky Sari Tono Umar Vina Wulan Yoga Zahra"
+).split()
+MESSAGES_PER_CONVERSATION = 20
+# Generated timestamps are ages before this instant, so a seed gives the same
+# rows whatever day it runs.
+DEFAULT_EPOCH = "2025-01-01T00:00:00+00:00"
+
+
+class PowerLaw:
+    """Zipf-like sampler: the item at rank r is drawn with weight (r + 1) ** -alpha."""
+
+    def __init__(self, n, alpha, rng):
+        # Ranks are shuffled so popularity is not tied to insertion order.
+        self.order = rng.permutation(n)
+        self.cdf = np.cumsum(np.arange(1, n + 1, dtype=np.float64) ** -alpha)
+
+    def sample(self, rng, size):
+        ranks = np.searchsorted(self.cdf, rng.random(size) * self.cdf[-1])
+        return self.order[np.minimum(ranks, len(self.order) - 1)]
+
+
+def unique_pairs(left, right, n_right):
+    """Drop duplicate ``(left, right)`` index pairs, sorted by left then right."""
+    keys = np.unique(left.astype(np.int64) * n_right + right)
+    return keys // n_right, keys % n_right
+
+
+def auto_created_at(model):
+    """The ``created_at`` field if bulk_create overwrites it with now()."""
+    fields = {field.name: field for field in model._meta.concrete_fields}
+    field = fields.get("created_at")
+    return field if getattr(field, "auto_now_add", False) else None
+
+
+@contextmanager
+def explicit_values(field):
+    """Let the INSERT write the objects' own values for an auto_now_add field."""
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def parse_epoch(value):
+    try:
+        epoch = datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid ISO 8601 datetime: {value!r}")
+    return epoch if epoch.tzinfo else epoch.replace(tzinfo=timezone.utc)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset for load testing: users, a "
+        "power-law follow graph, coin wallets, posts with hashtags, threaded "
+        "comments, likes, messages and notifications."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument(
+            "--follows-per-user",
+            type=float,
+            default=20,
+            help="Mean out-degree; in-degree follows the power law.",
+        )
+        parser.add_argument("--posts-per-user", type=float, default=5)
+        parser.add_argument("--comments-per-post", type=float, default=3)
+        parser.add_argument(
+            "--reply-ratio",
+            type=float,
+            default=0.4,
+            help="Share of comments that reply to another comment.",
+        )
+        parser.add_argument("--likes", type=int, help="Default: 20 per user.")
+        parser.add_argument("--comment-likes", type=int, help="Default: 5 per user.")
+        parser.add_argument("--messages", type=int, help="Default: 10 per user.")
+        parser.add_argument("--notifications", type=int, help="Default: 10 per user.")
+        parser.add_argument("--tags", type=int, default=500)
+        parser.add_argument(
+            "--alpha", type=float, default=1.1, help="Power-law exponent."
+        )
+        parser.add_argument(
+            "--days", type=int, default=365, help="Spread timestamps over this span."
+        )
+        parser.add_argument(
+            "--epoch",
+            type=parse_epoch,
+            default=DEFAULT_EPOCH,
+            help="Newest possible timestamp (ISO 8601, UTC unless given).",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument(
+            "--prefix",
+            default="load",
+            help="Prefix of generated usernames and tags.",
+        )
+        parser.add_argument("--password", default="loadtest-password")
+        parser.add_argument(
+            "--flush",
+            action="store_true",
+            help="Delete previously seeded users, their data and tags first.",
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 2:
+            raise CommandError("--users must be at least 2.")
+        if options["batch_size"] < 1 or options["tags"] < 1:
+            raise CommandError("--batch-size and --tags must be positive.")
+        for name, per_user in (
+            ("likes", 20),
+            ("comment_likes", 5),
+            ("messages", 10),
+            ("notifications", 10),
+        ):
+            if options[name] is None:
+                options[name] = per_user * options["users"]
+        self.options = options
+        self.n_users = options["users"]
+        self.batch_size = options["batch_size"]
+        self.prefix = options["prefix"]
+
+        seeded = CustomUser.objects.filter(username__startswith=f"{self.prefix}_")
+        seeded_tags = Tag.objects.filter(name__startswith=f"{self.prefix}_")
+        if options["flush"]:
+            self.stage("flush", lambda: seeded.delete()[0] + seeded_tags.delete()[0])
+        elif seeded.exists() or seeded_tags.exists():
+            raise CommandError(
+                f"Users prefixed '{self.prefix}_' already exist; pass --flush."
+            )
+
+        self.end = options["epoch"]
+        self.span = options["days"] * 86400
+        rng = self.rng(STAGE_WEIGHTS, 0)
+        self.popularity = PowerLaw(self.n_users, options["alpha"], rng)
+        self.activity = PowerLaw(self.n_users, options["alpha"], rng)
+        self.tag_weights = PowerLaw(options["tags"], options["alpha"], rng)
+
+        self.stage("users", self.create_users)
+        self.stage("wallets", self.create_wallets)
+        self.stage("follows", self.create_follows)
+        self.stage("tags", self.create_tags)
+        self.stage("posts", self.create_posts)
+        self.stage("comments", self.create_comments)
+        self.stage("post likes", self.create_post_likes)
+        self.stage("comment likes", self.create_comment_likes)
+        self.stage("messages", self.create_messages)
+        self.stage("notifications", self.create_notifications)
+
+    def rng(self, stage, batch):
+        return np.random.default_rng([self.options["seed"], stage, batch])
+
+    def stage(self, name, func):
+        start = time.perf_counter()
+        rows = func()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{name:<14} {rows:>12,} rows {elapsed:8.1f}s "
+            f"{rows / max(elapsed, 1e-9):>12,.0f} rows/s"
+        )
+
+    def batches(self, total):
+        for number, start in enumerate(range(0, total, self.batch_size)):
+            yield number, start, min(start + self.batch_size, total)
+
+    def dates(self, ages):
+        return [self.end - timedelta(seconds=age) for age in ages.tolist()]
+
+    def insert(self, model, objs):
+        # bulk_create stamps auto_now_add fields with now(); objects that
+        # carry a generated created_at have it written by the INSERT itself.
+        field = auto_created_at(model)
+        if field is None or any(obj.created_at is None for obj in objs):
+            created = self.bulk_create(model, objs)
+        else:
+            with explicit_values(field):
+                created = self.bulk_create(model, objs)
+        return np.array([obj.pk for obj in created], dtype=np.int64)
+
+    def bulk_create(self, model, objs):
+        created = model.objects.bulk_create(objs, batch_size=self.batch_size)
+        if created and created[0].pk is None:
+            raise CommandError(
+                "The database did not return ids from bulk_create; "
+                "use PostgreSQL or SQLite 3.35+."
+            )
+        return created
+
+    def follow_edges(self, number, start, stop):
+        """Follow edges of users ``start..stop``, identical on every call."""
+        rng = self.rng(STAGE_FOLLOWS, number)
+        mean = max(self.options["follows_per_user"], 1)
+        degrees = np.minimum(rng.geometric(1 / mean, stop - start), self.n_users - 1)
+        src = np.repeat(np.arange(start, stop), degrees)
+        src, dst = unique_pairs(
+            src, self.popularity.sample(rng, len(src)), self.n_users
+        )
+        keep = src != dst
+        return src[keep], dst[keep], rng.random(keep.sum()) * self.span
+
+    def create_users(self):
+        # The counters are denormalised onto CustomUser, so the graph is drawn
+        # once here for the degrees and again in create_follows for the rows.
+        followers = np.zeros(self.n_users, dtype=np.int64)
+        following = np.zeros(self.n_users, dtype=np.int64)
+        for batch in self.batches(self.n_users):
+            src, dst, _ = self.follow_edges(*batch)
+            following += np.bincount(src, minlength=self.n_users)
+            followers += np.bincount(dst, minlength=self.n_users)
+
+        # One PBKDF2 run for everybody instead of one per user.
+        password = make_password(self.options["password"])
+        ids = []
+        for number, start, stop in self.batches(self.n_users):
+            rng = self.rng(STAGE_USERS, number)
+            names = rng.integers(0, len(FIRST_NAMES), stop - start).tolist()
+            joined = self.dates(rng.random(stop - start) * self.span)
+            ids.append(
+                self.insert(
+                    CustomUser,
+                    [
+                        CustomUser(
+                            username=f"{self.prefix}_{i}",
+                            email=f"{self.prefix}_{i}@example.com",
+                            first_name=FIRST_NAMES[name],
+                            # bulk_create skips save(), which fills these.
+                            username_search=normalize(f"{self.prefix}_{i}"),
+                            name_search=normalize(FIRST_NAMES[name]),
+                            password=password,
+                            date_joined=date_joined,
+                            followers_count=int(followers[i]),
+                            following_count=int(following[i]),
+                        )
+                        for i, name, date_joined in zip(
+                            range(start, stop), names, joined
+                        )
+                    ],
+                )
+            )
+        self.user_ids = np.concatenate(ids)
+        return self.n_users
+
+    def create_wallets(self):
+        # About half the users have claimed at some point, some of them on the
+        # epoch's day.
+        for number, start, stop in self.batches(self.n_users):
+            rng = self.rng(STAGE_WALLETS, number)
+            claims = rng.geometric(0.05, stop - start) * (
+                rng.random(stop - start) < 0.5
+            )
+            days = rng.integers(0, self.options["days"] + 1, stop - start)
+            self.insert(
+                CoinWallet,
+                [
+                    CoinWallet(
+                        user_id=user_id,
+                        balance=count * DAILY_CLAIM_AMOUNT,
+                        last_claimed=(
+                            (self.end - timedelta(days=day)).date() if count else None
+                        ),
+                    )
+                    for user_id, count, day in zip(
+                        self.user_ids[start:stop].tolist(),
+                        claims.tolist(),
+                        days.tolist(),
+                    )
+                ],
+            )
+        return self.n_users
+
+    def create_follows(self):
+        total = 0
+        for batch in self.batches(self.n_users):
+            src, dst, ages = self.follow_edges(*batch)
+            self.insert(
+                Follow,
+                [
+                    Follow(follower_id=follower, following_id=following, created_at=at)
+                    for follower, following, at in zip(
+                        self.user_ids[src].tolist(),
+                        self.user_ids[dst].tolist(),
+                        self.dates(ages),
+                    )
+                ],
+            )
+            total += len(src)
+        return total
+
+    def create_tags(self):
+        self.tag_names = [f"{self.prefix}_tag_{i}" for i in range(self.options["tags"])]
+        self.tag_ids = self.insert(Tag, [Tag(name=name) for name in self.tag_names])
+        return len(self.tag_ids)
+
+    def create_posts(self):
+        total = int(self.n_users * self.options["posts_per_user"])
+        n_tags = len(self.tag_ids)
+        popularity = np.zeros(n_tags, dtype=np.int64)
+        through = Post.tags.through
+        ids, authors, ages = [], [], []
+        for number, start, stop in self.batches(total):
+            rng = self.rng(STAGE_POSTS, number)
+            size = stop - start
+            author = self.activity.sample(rng, size)
+            age = rng.random(size) * self.span
+            words = rng.integers(0, len(WORDS), (size, 12)).tolist()
+            lengths = rng.integers(3, 13, size).tolist()
+            tag_counts = rng.integers(0, 4, size)
+            post_index, tag_index = unique_pairs(
+                np.repeat(np.arange(size), tag_counts),
+                self.tag_weights.sample(rng, int(tag_counts.sum())),
+                n_tags,
+            )
+            hashtags = [[] for _ in range(size)]
+            for post, tag in zip(post_index.tolist(), tag_index.tolist()):
+                hashtags[post].append(f"#{self.tag_names[tag]}")
+            post_ids = self.insert(
+                Post,
+                [
+                    Post(
+                        user_id=user_id,
+                        content=" ".join([WORDS[w] for w in row[:length]] + tags),
+                        created_at=at,
+                    )
+                    for user_id, row, length, tags, at in zip(
+                        self.user_ids[author].tolist(),
+                        words,
+                        lengths,
+                        hashtags,
+                        self.dates(age),
+                    )
+                ],
+            )
+            # Straight into the M2M through table instead of post.tags.add().
+            self.insert(
+                through,
+                [
+                    through(post_id=post_id, tag_id=tag_id)
+                    for post_id, tag_id in zip(
+                        post_ids[post_index].tolist(),
+                        self.tag_ids[tag_index].tolist(),
+                    )
+                ],
+            )
+            popularity += np.bincount(tag_index, minlength=n_tags)
+            ids.append(post_ids)
+            authors.append(author)
+            ages.append(age)
+        self.post_ids = np.concatenate(ids) if ids else np.zeros(0, np.int64)
+        self.post_authors = np.concatenate(authors) if ids else np.zeros(0, np.int64)
+        self.post_ages = np.concatenate(ages) if ids else np.zeros(0)
+        with transaction.atomic():
+            Tag.objects.bulk_update(
+                [
+                    Tag(id=tag_id, popularity=count)
+                    for tag_id, count in zip(self.tag_ids.tolist(), popularity.tolist())
+                ],
+                ["popularity"],
+                batch_size=self.batch_size,
+            )
+        return total
+
+    def create_comments(self):
+        """Top-level comments first, then replies to a top-level comment of the same post."""
+        n_posts = len(self.post_ids)
+        ids, posts, replies = [], [], []
+        for number, start, stop in self.batches(n_posts):
+            rng = self.rng(STAGE_COMMENTS, number)
+            counts = rng.poisson(self.options["comments_per_post"], stop - start)
+            post = np.repeat(np.arange(start, stop), counts)
+            reply = rng.random(len(post)) < self.options["reply_ratio"]
+            top_post = post[~reply]
+            top_author = self.activity.sample(rng, len(top_post))
+            top_age = self.post_ages[top_post] * rng.random(len(top_post))
+            top_ids = self.insert(
+                Comment,
+                self.comments(
+                    rng, top_post, top_author, top_age, [None] * len(top_post)
+                ),
+            )
+            # top_post is sorted, so each post's top-level comments are a slice.
+            reply_post = post[reply]
+            first = np.searchsorted(top_post, reply_post, side="left")
+            available = np.searchsorted(top_post, reply_post, side="right") - first
+            has_parent = available > 0
+            reply_post, first, available = (
+                reply_post[has_parent],
+                first[has_parent],
+                available[has_parent],
+            )
+            parent = first + (rng.random(len(first)) * available).astype(np.int64)
+            reply_author = self.activity.sample(rng, len(parent))
+            reply_age = top_age[parent] * rng.random(len(parent))
+            reply_ids = self.insert(
+                Comment,
+                self.comments(
+                    rng,
+                    reply_post,
+                    reply_author,
+                    reply_age,
+                    top_ids[parent].tolist(),
+                ),
+            )
+            ids += [top_ids, reply_ids]
+            posts += [top_post, reply_post]
+            replies.append((reply_ids, reply_post, reply_author, top_author[parent]))
+        self.comment_ids = np.concatenate(ids) if ids else np.zeros(0, np.int64)
+        self.comment_posts = np.concatenate(posts) if ids else np.zeros(0, np.int64)
+        # Reply notifications go from a reply's author to its parent's author.
+        (
+            self.reply_ids,
+            self.reply_posts,
+            self.reply_authors,
+            self.reply_parent_authors,
+        ) = (
+            [np.concatenate(column) for column in zip(*replies)]
+            if replies
+            else [np.zeros(0, np.int64)] * 4
+        )
+        return len(self.comment_ids)
+
+    def comments(self, rng, post, author, age, parents):
+        words = rng.integers(0, len(WORDS), (len(post), 6)).tolist()
+        return [
+            Comment(
+                user_id=user_id,
+                post_id=post_id,
+                parent_id=parent_id,
+                content=" ".join(WORDS[w] for w in row),
+                created_at=at,
+            )
+            for user_id, post_id, parent_id, row, at in zip(
+                self.user_ids[author].tolist(),
+                self.post_ids[post].tolist(),
+                parents,
+                words,
+                self.dates(age),
+            )
+        ]
+
+    def create_post_likes(self):
+        if not len(self.post_ids):
+            return 0
+        weights = PowerLaw(
+            len(self.post_ids), self.options["alpha"], self.rng(STAGE_WEIGHTS, 1)
+        )
+        return self.create_likes(
+            PostLike,
+            "post_id",
+            self.post_ids,
+            self.options["likes"],
+            STAGE_POST_LIKES,
+            lambda rng, size: weights.sample(rng, size),
+            self.post_ages,
+        )
+
+    def create_comment_likes(self):
+        if not len(self.comment_ids):
+            return 0
+        return self.create_likes(
+            CommentLike,
+            "comment_id",
+            self.comment_ids,
+            self.options["comment_likes"],
+            STAGE_COMMENT_LIKES,
+            lambda rng, size: rng.integers(0, len(self.comment_ids), size),
+            self.post_ages[self.comment_posts],
+        )
+
+    def create_likes(self, model, target_field, target_ids, total, stage, pick, ages):
+        # Power-law sampling repeats popular (user, target) pairs. The draws
+        # are made once to find each pair's first occurrence and again to
+        # write only those, so fewer rows than requested are written and none
+        # hits the unique constraint. The return value is what landed.
+        n_targets = len(target_ids)
+
+        def draw(number, start, stop):
+            rng = self.rng(stage, number)
+            user, target = unique_pairs(
+                self.activity.sample(rng, stop - start),
+                pick(rng, stop - start),
+                n_targets,
+            )
+            return user, target, ages[target] * rng.random(len(target))
+
+        keys = [
+            user.astype(np.int64) * n_targets + target
+            for user, target, _ in (draw(*batch) for batch in self.batches(total))
+        ]
+        if not keys:
+            return 0
+        first = np.zeros(sum(len(batch_keys) for batch_keys in keys), dtype=bool)
+        first[np.unique(np.concatenate(keys), return_index=True)[1]] = True
+        offset = 0
+        for batch in self.batches(total):
+            user, target, age = draw(*batch)
+            keep = first[offset : offset + len(user)]
+            offset += len(user)
+            self.insert(
+                model,
+                [
+                    model(user_id=user_id, created_at=at, **{target_field: target_id})
+                    for user_id, target_id, at in zip(
+                        self.user_ids[user[keep]].tolist(),
+                        target_ids[target[keep]].tolist(),
+                        self.dates(age[keep]),
+                    )
+                ],
+            )
+        return int(first.sum())
+
+    def create_messages(self):
+        total = self.options["messages"]
+        rng = self.rng(STAGE_WEIGHTS, 2)
+        n_conversations = max(1, total // MESSAGES_PER_CONVERSATION)
+        left = self.activity.sample(rng, n_conversations)
+        right = self.popularity.sample(rng, n_conversations)
+        right = np.where(left == right, (right + 1) % self.n_users, right)
+        words = np.array(WORDS, dtype=object)
+        # (low, high) -> [age of newest message, its id, unread_low, unread_high]
+        summaries = {}
+        for number, start, stop in self.batches(total):
+            rng = self.rng(STAGE_MESSAGES, number)
+            size = stop - start
+            conversation = rng.integers(0, n_conversations, size)
+            flip = rng.random(size) < 0.5
+            sender = self.user_ids[
+                np.where(flip, left[conversation], right[conversation])
+            ]
+            recipient = self.user_ids[
+                np.where(flip, right[conversation], left[conversation])
+            ]
+            age = rng.random(size) * self.span
+            content = words[rng.integers(0, len(WORDS), (size, 8))].tolist()
+            is_read = (age > 86400) | (rng.random(size) < 0.5)
+            ids = self.insert(
+                Message,
+                [
+                    Message(
+                        sender_id=sender_id,
+                        recipient_id=recipient_id,
+                        conversation_key=conversation_key(sender_id, recipient_id),
+                        content=" ".join(row),
+                        is_read=read,
+                        created_at=at,
+                    )
+                    for sender_id, recipient_id, row, read, at in zip(
+                        sender.tolist(),
+                        recipient.tolist(),
+                        content,
+                        is_read.tolist(),
+                        self.dates(age),
+                    )
+                ],
+            )
+            for sender_id, recipient_id, age_s, read, message_id in zip(
+                sender.tolist(),
+                recipient.tolist(),
+                age.tolist(),
+                is_read.tolist(),
+                ids.tolist(),
+            ):
+                pair = (min(sender_id, recipient_id), max(sender_id, recipient_id))
+                summary = summaries.setdefault(pair, [float("inf"), None, 0, 0])
+                if age_s < summary[0]:
+                    summary[0], summary[1] = age_s, message_id
+                if not read:
+                    summary[2 if recipient_id == pair[0] else 3] += 1
+        self.insert(
+            Conversation,
+            [
+                Conversation(
+                    user_low_id=low,
+                    user_high_id=high,
+                    last_message_id=message_id,
+                    last_activity=self.end - timedelta(seconds=age_s),
+                    unread_low=unread_low,
+                    unread_high=unread_high,
+                )
+                for (low, high), (age_s, message_id, unread_low, unread_high) in sorted(
+                    summaries.items()
+                )
+            ],
+        )
+        return total
+
+    def create_notifications(self):
+        if not len(self.post_ids):
+            return 0
+        total = self.options["notifications"]
+        has_replies = len(self.reply_ids) > 0
+        for number, start, stop in self.batches(total):
+            rng = self.rng(STAGE_NOTIFICATIONS, number)
+            size = stop - start
+            sender = self.activity.sample(rng, size)
+            post = rng.integers(0, len(self.post_ids), size)
+            recipient = self.post_authors[post]
+            comment_ids = [None] * size
+            reply = np.zeros(size, dtype=bool)
+            if has_replies:
+                # Reply notifications point at the reply and at its post, as
+                # CommentCreateView sends them.
+                reply = rng.random(size) < 0.3
+                pick = rng.integers(0, len(self.reply_ids), size)
+                post = np.where(reply, self.reply_posts[pick], post)
+                sender = np.where(reply, self.reply_authors[pick], sender)
+                recipient = np.where(reply, self.reply_parent_authors[pick], recipient)
+                comment_ids = np.where(reply, self.reply_ids[pick], 0).tolist()
+            age = self.post_ages[post] * rng.random(size)
+            self.insert(
+                Notification,
+                [
+                    Notification(
+                        recipient_id=recipient_id,
+                        sender_id=int(self.user_ids[sender_index]),
+                        notification_type="reply" if is_reply else "like",
+                        post_id=post_id,
+                        comment_id=comment_id if is_reply else None,
+                        message=f"{self.prefix}_{sender_index} "
+                        + (
+                            "replied to your comment."
+                            if is_reply
+                            else "liked your post."
+                        ),
+                        is_read=age_s > 86400,
+                        created_at=at,
+                    )
+                    for recipient_id, sender_index, is_reply, post_id, comment_id, age_s, at in zip(
+                        self.user_ids[recipient].tolist(),
+                        sender.tolist(),
+                        reply.tolist(),
+                        self.post_ids[post].tolist(),
+                        comment_ids,
+                        age.tolist(),
+                        self.dates(age),
+                    )
+                ],
+            )
+        return total
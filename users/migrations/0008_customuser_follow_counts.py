@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-19 00:21
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_follow_counts(apps, schema_editor):
+    CustomUser = apps.get_model("users", "CustomUser")
+    Follow = apps.get_model("users", "Follow")
+
+    def count_of(field):
+        return Coalesce(
+            Subquery(
+                Follow.objects.filter(**{field: OuterRef("pk")})
+                .values(field)
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+
+    CustomUser.objects.update(
+        followers_count=count_of("following"),
+        following_count=count_of("follower"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_coinclaimhistory"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="coinclaimhistory",
+            options={
+                "ordering": ["-claimed_at"],
+                "verbose_name": "Coin Claim History",
+                "verbose_name_plural": "Coin Claim Histories",
+            },
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="followers_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="following_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_follow_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-19 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_customuser_follow_counts"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["following", "created_at", "id"],
+                name="follow_following_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["follower", "created_at", "id"],
+                name="follow_follower_created_idx",
+            ),
+        ),
+    ]
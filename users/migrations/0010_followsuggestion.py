@@ -0,0 +1,56 @@
+# Generated by Django 5.2.1 on 2026-10-19 00:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0009_follow_created_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FollowSuggestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("mutual_count", models.PositiveIntegerField(default=0)),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "suggested",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="follow_suggestions",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["user", "rank"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "rank"], name="suggestion_user_rank_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.1 on 2026-10-19 00:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def move_balances_to_wallets(apps, schema_editor):
+    CustomUser = apps.get_model("users", "CustomUser")
+    CoinWallet = apps.get_model("users", "CoinWallet")
+    users = (
+        CustomUser.objects.exclude(coins=0, last_claimed__isnull=True)
+        .values_list("pk", "coins", "last_claimed")
+        .iterator(chunk_size=2000)
+    )
+    batch = []
+    for pk, coins, last_claimed in users:
+        batch.append(CoinWallet(user_id=pk, balance=coins, last_claimed=last_claimed))
+        if len(batch) >= 2000:
+            CoinWallet.objects.bulk_create(batch)
+            batch = []
+    CoinWallet.objects.bulk_create(batch)
+
+
+def move_balances_to_users(apps, schema_editor):
+    CustomUser = apps.get_model("users", "CustomUser")
+    CoinWallet = apps.get_model("users", "CoinWallet")
+    wallet = CoinWallet.objects.filter(user_id=OuterRef("pk"))
+    CustomUser.objects.filter(wallet__isnull=False).update(
+        coins=Subquery(wallet.values("balance")),
+        last_claimed=Subquery(wallet.values("last_claimed")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0010_followsuggestion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CoinWallet",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="wallet",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("balance", models.IntegerField(default=0)),
+                ("last_claimed", models.DateField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(move_balances_to_wallets, move_balances_to_users),
+        migrations.RemoveField(
+            model_name="customuser",
+            name="coins",
+        ),
+        migrations.RemoveField(
+            model_name="customuser",
+            name="last_claimed",
+        ),
+    ]
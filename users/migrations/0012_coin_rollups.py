@@ -0,0 +1,96 @@
+# Generated by Django 5.2.1 on 2026-10-19 00:47
+
+from collections import defaultdict
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_rollups(apps, schema_editor):
+    CoinClaimHistory = apps.get_model("users", "CoinClaimHistory")
+    CoinRollup = apps.get_model("users", "CoinRollup")
+    totals = defaultdict(lambda: [0, 0])
+    claims = CoinClaimHistory.objects.values_list(
+        "user_id", "claimed_at", "amount"
+    ).iterator(chunk_size=2000)
+    for user_id, claimed_at, amount in claims:
+        day = claimed_at.date()
+        for period, start in (
+            ("day", day),
+            ("week", day - timedelta(days=day.weekday())),
+            ("month", day.replace(day=1)),
+        ):
+            row = totals[user_id, period, start]
+            row[0] += amount
+            row[1] += 1
+    CoinRollup.objects.bulk_create(
+        [
+            CoinRollup(
+                user_id=user_id,
+                period=period,
+                period_start=start,
+                total=total,
+                claims=count,
+            )
+            for (user_id, period, start), (total, count) in totals.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0011_coinwallet"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CoinRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("day", "Day"), ("week", "Week"), ("month", "Month")],
+                        max_length=5,
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("total", models.IntegerField(default=0)),
+                ("claims", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="coinclaimhistory",
+            index=models.Index(
+                fields=["user", "claimed_at", "id"], name="coinclaim_user_claimed_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="coinrollup",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="coin_rollups",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="coinrollup",
+            constraint=models.UniqueConstraint(
+                fields=("user", "period", "period_start"), name="coin_rollup_unique"
+            ),
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-19 00:52
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize(value):
+    # Frozen copy of users.search.normalize.
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def backfill_search_fields(apps, schema_editor):
+    CustomUser = apps.get_model("users", "CustomUser")
+    batch = []
+    users = CustomUser.objects.only("username", "first_name", "last_name")
+    for user in users.iterator(chunk_size=2000):
+        user.username_search = normalize(user.username)
+        user.name_search = normalize(f"{user.first_name} {user.last_name}")
+        batch.append(user)
+        if len(batch) >= 2000:
+            CustomUser.objects.bulk_update(batch, ["username_search", "name_search"])
+            batch = []
+    CustomUser.objects.bulk_update(batch, ["username_search", "name_search"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0012_coin_rollups"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="name_search",
+            field=models.CharField(blank=True, db_index=True, max_length=301),
+        ),
+        migrations.AddField(
+            model_name="customuser",
+            name="username_search",
+            field=models.CharField(blank=True, db_index=True, max_length=150),
+        ),
+        migrations.RunPython(backfill_search_fields, migrations.RunPython.noop),
+    ]
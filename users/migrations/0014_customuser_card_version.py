@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-19 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0013_user_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="card_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.1 on 2026-10-19 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0014_customuser_card_version"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                fields=["-followers_count", "id"], name="user_followers_idx"
+            ),
+        ),
+    ]
@@ -1,8 +1,14 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 
 from media_utils import ImageVariantMixin, get_media_storage
 
+from .authentication import AUTH_FIELDS, invalidate_auth_user
+from .cards import CARD_FIELDS, invalidate_user_card
+from .search import normalize
+
+SEARCH_SOURCE_FIELDS = {"username", "first_name", "last_name"}
+
 
 class CustomUser(AbstractUser, ImageVariantMixin):
     bio = models.TextField(blank=True, null=True)
@@ -13,10 +19,44 @@ class CustomUser(AbstractUser, ImageVariantMixin):
     avatar_md = models.URLField(blank=True, null=True)
     avatar_lg = models.URLField(blank=True, null=True)
     phone_number = models.CharField(max_length=20, unique=True, null=True, blank=True)
-    coins = models.IntegerField(default=0)  # Add coin balance
-    last_claimed = models.DateField(null=True, blank=True)  # Track last claim date
+    # Denormalized from Follow, kept in step by the follow/unfollow views
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    # Normalized copies for indexed prefix search, see users.search
+    username_search = models.CharField(max_length=150, blank=True, db_index=True)
+    name_search = models.CharField(max_length=301, blank=True, db_index=True)
+    # Moves on every card change; ETags of lists that show cards include it
+    card_version = models.PositiveIntegerField(default=0)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Search ranking: short prefixes walk users from the most followed.
+            models.Index(fields=["-followers_count", "id"], name="user_followers_idx"),
+        ]
 
     def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or set(update_fields) & SEARCH_SOURCE_FIELDS:
+            self.username_search = normalize(self.username)
+            self.name_search = normalize(f"{self.first_name} {self.last_name}")
+            if update_fields is not None:
+                kwargs["update_fields"] = {
+                    *update_fields,
+                    "username_search",
+                    "name_search",
+                }
+        snapshot = getattr(self, "_auth_snapshot", None)
+        if snapshot is not None and not self._state.adding:
+            kwargs["update_fields"] = self.fresh_fields(
+                snapshot, kwargs.get("update_fields")
+            )
+        update_fields = kwargs.get("update_fields")
+        changed = set(CARD_FIELDS) | set(AUTH_FIELDS)
+        if update_fields is not None:
+            changed &= set(update_fields)
+        if not adding and changed & set(CARD_FIELDS):
+            kwargs["update_fields"] = self.bump_card_version(update_fields)
         super().save(*args, **kwargs)
         if self.avatar:
             storage = get_media_storage()
@@ -25,7 +65,63 @@ class CustomUser(AbstractUser, ImageVariantMixin):
             self.avatar_sm = variants.get("sm")
             self.avatar_md = variants.get("md")
             self.avatar_lg = variants.get("lg")
-            super().save(update_fields=["avatar_sm", "avatar_md", "avatar_lg"])
+            variant_fields = ["avatar_sm", "avatar_md", "avatar_lg"]
+            if not adding:
+                variant_fields = self.bump_card_version(variant_fields)
+            super().save(update_fields=variant_fields)
+            changed.add("avatar_sm")
+        # Only once every column is written; again at commit, since readers
+        # in other connections still see the old row until then.
+        self.invalidate_caches(changed)
+        transaction.on_commit(lambda: self.invalidate_caches(changed))
+
+    def fresh_fields(self, snapshot, update_fields):
+        """
+        ``update_fields`` (default: every loaded field) without the cached
+        auth values this instance still holds unchanged.
+        """
+        if update_fields is None:
+            deferred = self.get_deferred_fields()
+            update_fields = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+            ]
+        stale = {
+            name for name, value in snapshot.items() if getattr(self, name) == value
+        }
+        if "username" in stale:
+            stale.add("username_search")
+        return [name for name in update_fields if name not in stale]
+
+    def bump_card_version(self, update_fields):
+        """
+        Increment ``card_version`` in the same UPDATE as ``update_fields``.
+        The attribute holds the expression until the next refresh_from_db().
+        """
+        self.card_version = models.F("card_version") + 1
+        if update_fields is None:
+            return None
+        return [*update_fields, "card_version"]
+
+    def invalidate_caches(self, changed):
+        if changed & set(CARD_FIELDS):
+            invalidate_user_card(self.pk)
+        if changed & set(AUTH_FIELDS):
+            invalidate_auth_user(self.pk)
+
+    def delete(self, *args, **kwargs):
+        invalidate_auth_user(self.pk)
+        return super().delete(*args, **kwargs)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # Users from CachedJWTAuthentication only carry AUTH_FIELDS; the first
+        # deferred field a view touches loads all the others in one query.
+        if fields is not None:
+            deferred_fields = self.get_deferred_fields()
+            if deferred_fields & set(fields):
+                fields = set(fields) | deferred_fields
+        super().refresh_from_db(using, fields, **kwargs)
 
     def __str__(self):
         return self.username
@@ -42,11 +138,59 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ("follower", "following")
+        indexes = [
+            # Keyset pagination of follower/following lists, newest first.
+            models.Index(
+                fields=["following", "created_at", "id"],
+                name="follow_following_created_idx",
+            ),
+            models.Index(
+                fields=["follower", "created_at", "id"],
+                name="follow_follower_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.follower.username} follows {self.following.username}"
 
 
+class FollowSuggestion(models.Model):
+    """Precomputed friends-of-friends suggestion, see users.suggestions."""
+
+    user = models.ForeignKey(
+        "CustomUser", related_name="follow_suggestions", on_delete=models.CASCADE
+    )
+    suggested = models.ForeignKey(
+        "CustomUser", related_name="+", on_delete=models.CASCADE
+    )
+    mutual_count = models.PositiveIntegerField(default=0)
+    rank = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["user", "rank"]
+        indexes = [
+            models.Index(fields=["user", "rank"], name="suggestion_user_rank_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.suggested_id} suggested to {self.user_id}"
+
+
+class CoinWallet(models.Model):
+    """Coin balance, kept off the wide user row; written only by users.coins."""
+
+    user = models.OneToOneField(
+        CustomUser, primary_key=True, related_name="wallet", on_delete=models.CASCADE
+    )
+    balance = models.IntegerField(default=0)
+    last_claimed = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.balance} coins"
+
+
 class CoinClaimHistory(models.Model):
     user = models.ForeignKey(
         CustomUser, related_name="coin_claims", on_delete=models.CASCADE
@@ -58,6 +202,40 @@ class CoinClaimHistory(models.Model):
         ordering = ["-claimed_at"]
         verbose_name = "Coin Claim History"
         verbose_name_plural = "Coin Claim Histories"
+        indexes = [
+            # Keyset pagination of a user's history, newest first.
+            models.Index(
+                fields=["user", "claimed_at", "id"], name="coinclaim_user_claimed_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} claimed {self.amount} coins at {self.claimed_at}"
+
+
+class CoinRollup(models.Model):
+    """Per-user coin totals for one day, week or month, kept by users.coins."""
+
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+    PERIODS = [(DAY, "Day"), (WEEK, "Week"), (MONTH, "Month")]
+
+    user = models.ForeignKey(
+        CustomUser, related_name="coin_rollups", on_delete=models.CASCADE
+    )
+    period = models.CharField(max_length=5, choices=PERIODS)
+    period_start = models.DateField()
+    total = models.IntegerField(default=0)
+    claims = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves the newest-first summary scan per user and period.
+            models.UniqueConstraint(
+                fields=["user", "period", "period_start"], name="coin_rollup_unique"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.period} {self.period_start}: {self.total}"
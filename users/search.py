@@ -0,0 +1,58 @@
+"""
+Prefix search over usernames and full names.
+
+CustomUser keeps ``username_search`` and ``name_search``, lower-cased and
+accent-stripped copies of the username and "first last", each with a B-tree
+index. How a prefix reaches that index depends on the backend:
+
+* SQLite compares text with the BINARY collation, in code point order, so
+  the prefix becomes a ``[prefix, prefix + U+10FFFF)`` range. Its LIKE is
+  case-insensitive and would not use the index.
+* Elsewhere a range is only correct under a code point collation, so the
+  prefix is a ``startswith`` (``LIKE 'prefix%'``). PostgreSQL answers it from
+  the ``varchar_pattern_ops`` index Django creates next to each ``db_index``
+  CharField, MySQL from the plain index.
+
+Matches are ranked by ``followers_count``. A prefix shorter than
+SHORT_PREFIX_LENGTH can match a large part of the table, so it is matched
+with a plain ``startswith`` that neither backend answers from the search
+indexes; the query then walks ``user_followers_idx`` from the most followed
+user down and stops after ``limit`` matches, without sorting them all.
+"""
+
+import unicodedata
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+
+PREFIX_END = "\U0010ffff"
+SHORT_PREFIX_LENGTH = 3
+
+
+def normalize(value):
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def prefix_match(field, prefix):
+    if len(prefix) < SHORT_PREFIX_LENGTH:
+        return Q(**{f"{field}__startswith": prefix})
+    if connection.vendor == "sqlite":
+        return Q(**{f"{field}__gte": prefix, f"{field}__lt": prefix + PREFIX_END})
+    return Q(**{f"{field}__startswith": prefix})
+
+
+def search_users(query, limit):
+    """Active users whose username or full name starts with ``query``."""
+    prefix = normalize(query.lstrip("@"))
+    if not prefix:
+        return get_user_model().objects.none()
+    users = get_user_model().objects.filter(
+        prefix_match("username_search", prefix) | prefix_match("name_search", prefix),
+        is_active=True,
+    )
+    return users.order_by("-followers_count", "id").values(
+        "id", "username", "first_name", "last_name", "avatar_sm", "followers_count"
+    )[:limit]
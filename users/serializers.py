@@ -3,11 +3,66 @@ from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
 import re
 
-from .models import CustomUser, CoinClaimHistory
+from .availability import taken_index
+from .cards import get_user_cards
+from .models import CustomUser, CoinClaimHistory, CoinRollup, FollowSuggestion
 
 User = get_user_model()
 
 
+class UserCardField(serializers.Field):
+    """
+    Read-only user rendered from the card cache; ``source`` must be the user id.
+
+    Pass ``card_field`` to render a single attribute such as the username.
+    """
+
+    def __init__(self, card_field=None, **kwargs):
+        kwargs["read_only"] = True
+        self.card_field = card_field
+        super().__init__(**kwargs)
+
+    def to_representation(self, user_id):
+        card = self.parent.user_cards.get(user_id)
+        if card is None or self.card_field is None:
+            return card
+        return card[self.card_field]
+
+
+class UserCardListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        instances = list(data.all() if hasattr(data, "all") else data)
+        self.child.load_user_cards(instances)
+        return super().to_representation(instances)
+
+
+class UserCardsMixin:
+    """
+    Loads every UserCardField of a page with a single get_user_cards() call.
+
+    Serializers using it set ``list_serializer_class = UserCardListSerializer``.
+    """
+
+    user_cards = None
+
+    def load_user_cards(self, instances):
+        card_fields = [
+            field
+            for field in self.fields.values()
+            if isinstance(field, UserCardField)
+        ]
+        self.user_cards = get_user_cards(
+            field.get_attribute(instance)
+            for instance in instances
+            for field in card_fields
+        )
+
+    def to_representation(self, instance):
+        if not isinstance(self.parent, UserCardListSerializer):
+            self.load_user_cards([instance])
+        return super().to_representation(instance)
+
+
 class LoginByEmailOrPhoneSerializer(serializers.Serializer):
     email_or_phone = serializers.CharField()
     password = serializers.CharField(write_only=True)
@@ -86,9 +141,29 @@ class RegisterSerializer(serializers.ModelSerializer):
         user.phone_number = validated_data["phone_number"]
         user.set_password(validated_data["password"])
         user.save()
+        taken_index.add(user)
         return user
 
 
+class AvailabilitySerializer(serializers.Serializer):
+    username = serializers.RegexField(
+        r"^[A-Za-z0-9_]+$",
+        required=False,
+        max_length=150,
+        error_messages={
+            "invalid": "Username can only contain letters, numbers, and underscores (_)."
+        },
+    )
+    email = serializers.EmailField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError(
+                {"non_field_errors": "Pass a username and/or an email to check."}
+            )
+        return attrs
+
+
 class ProfilePictureSerializer(serializers.ModelSerializer):
     avatar = serializers.ImageField(required=False, allow_null=True)
     avatar_sm = serializers.URLField(read_only=True)
@@ -106,10 +181,42 @@ class CoinClaimHistorySerializer(serializers.ModelSerializer):
         fields = ["id", "claimed_at", "amount"]
 
 
+class CoinRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CoinRollup
+        fields = ["period_start", "total", "claims"]
+
+
 class UserIdSerializer(serializers.Serializer):
     user_id = serializers.IntegerField(required=True, help_text="ID of the user to follow/unfollow")
 
 
+class BulkFollowSerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500,
+        help_text="IDs of the users to follow/unfollow (at most 500)",
+    )
+
+
 class UserListSerializer(serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     username = serializers.CharField(read_only=True)
+    avatar_sm = serializers.URLField(read_only=True, allow_null=True)
+    is_followed_by_viewer = serializers.BooleanField(read_only=True)
+
+
+class UserSearchSerializer(UserListSerializer):
+    first_name = serializers.CharField(read_only=True)
+    last_name = serializers.CharField(read_only=True)
+    followers_count = serializers.IntegerField(read_only=True)
+
+
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source="suggested_id", read_only=True)
+    username = serializers.CharField(source="suggested.username", read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ["id", "username", "mutual_count"]
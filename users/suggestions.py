@@ -0,0 +1,110 @@
+"""
+Friends-of-friends follow suggestions.
+
+The Follow table is streamed once into a CSR adjacency snapshot (``indptr`` /
+``indices`` NumPy arrays over dense user indices). For every user the accounts
+followed by the people they follow are gathered with one vectorized slice,
+counted, and the top-N candidates are stored as FollowSuggestion rows.
+"""
+
+from array import array
+
+import numpy as np
+from django.db import transaction
+
+from .models import CustomUser, Follow, FollowSuggestion
+
+STREAM_CHUNK_SIZE = 10000
+
+
+class FollowGraph:
+    def __init__(self, user_ids, indptr, indices):
+        self.user_ids = user_ids
+        self.indptr = indptr
+        self.indices = indices
+        self.in_degree = np.bincount(indices, minlength=len(user_ids))
+
+    @classmethod
+    def from_database(cls, chunk_size=STREAM_CHUNK_SIZE):
+        user_ids = np.fromiter(
+            CustomUser.objects.order_by("id")
+            .values_list("id", flat=True)
+            .iterator(chunk_size=chunk_size),
+            dtype=np.int64,
+        )
+        followers, followings = array("q"), array("q")
+        rows = (
+            Follow.objects.order_by("follower_id", "following_id")
+            .values_list("follower_id", "following_id")
+            .iterator(chunk_size=chunk_size)
+        )
+        for follower_id, following_id in rows:
+            followers.append(follower_id)
+            followings.append(following_id)
+        src = cls._to_nodes(user_ids, np.frombuffer(followers, dtype=np.int64))
+        dst = cls._to_nodes(user_ids, np.frombuffer(followings, dtype=np.int64))
+        # Drop edges to users created after the id snapshot was taken.
+        known = (src >= 0) & (dst >= 0)
+        src, dst = src[known], dst[known]
+        # Rows arrive sorted by follower, so dst is already in CSR order.
+        indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(user_ids)), out=indptr[1:])
+        return cls(user_ids, indptr, dst.astype(np.int32))
+
+    @staticmethod
+    def _to_nodes(user_ids, ids):
+        """Map user ids to dense node numbers, -1 for ids not in ``user_ids``."""
+        if not len(user_ids):
+            return np.full(len(ids), -1, dtype=np.int64)
+        nodes = np.searchsorted(user_ids, ids)
+        clipped = np.minimum(nodes, len(user_ids) - 1)
+        return np.where(user_ids[clipped] == ids, clipped, -1)
+
+    def following(self, node):
+        return self.indices[self.indptr[node] : self.indptr[node + 1]]
+
+    def suggest(self, node, top_n):
+        """Return ``[(candidate_node, mutual_count), ...]`` best first."""
+        direct = self.following(node)
+        if not len(direct):
+            return []
+        starts = self.indptr[direct]
+        lengths = self.indptr[direct + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return []
+        # Gather every followee's following list in one fancy-indexing pass.
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        candidates = self.indices[offsets + np.arange(total)]
+        nodes, counts = np.unique(candidates, return_counts=True)
+        keep = (nodes != node) & ~np.isin(nodes, direct, assume_unique=True)
+        nodes, counts = nodes[keep], counts[keep]
+        if not len(nodes):
+            return []
+        # Most mutual connections first, then most followed overall.
+        order = np.lexsort((-self.in_degree[nodes], -counts))[:top_n]
+        return list(zip(nodes[order].tolist(), counts[order].tolist()))
+
+
+def rebuild_follow_suggestions(top_n=20, batch_size=1000):
+    """Recompute and store suggestions for every user. Returns rows written."""
+    graph = FollowGraph.from_database()
+    written = 0
+    for start in range(0, len(graph.user_ids), batch_size):
+        nodes = range(start, min(start + batch_size, len(graph.user_ids)))
+        rows = [
+            FollowSuggestion(
+                user_id=int(graph.user_ids[node]),
+                suggested_id=int(graph.user_ids[candidate]),
+                mutual_count=mutuals,
+                rank=rank,
+            )
+            for node in nodes
+            for rank, (candidate, mutuals) in enumerate(graph.suggest(node, top_n))
+        ]
+        batch_user_ids = graph.user_ids[start : start + batch_size].tolist()
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=batch_user_ids).delete()
+            FollowSuggestion.objects.bulk_create(rows, batch_size=batch_size)
+        written += len(rows)
+    return written
@@ -1,17 +1,51 @@
-from io import BytesIO
+import json
+import tempfile
+from datetime import datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from PIL import Image
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from media_utils import (
+    ImageVariantMixin,
+    InjectedStorageError,
+    LatencyMediaStorage,
+    LocalMediaStorage,
+)
+from messages.models import Conversation, Message
+from notifications.models import Notification
+from posts.models import Comment, Post, PostLike, Tag
+from users import search
+from users.authentication import CachedJWTAuthentication, invalidate_auth_user
+from users.availability import BloomFilter, taken_index
+from users.cards import get_user_cards
+from users.coins import add_to_rollups, claim_daily_coins, period_starts
+from users.management.commands.seed_load import DEFAULT_EPOCH
+from users.models import CoinClaimHistory, CoinRollup, CoinWallet, Follow
+from users.throttling import LoginIdentifierThrottle
+
 User = get_user_model()
 
 
 class UserAuthTests(APITestCase):
     def setUp(self):
+        # Throttle buckets live in the cache and would leak between tests.
+        cache.clear()
         self.register_url = reverse("register")
         self.login_url = reverse("login")
         self.user_data = {
@@ -86,16 +120,20 @@ class UserAuthTests(APITestCase):
         followers_url = reverse("followers_list", args=[user2.id])
         response = self.client.get(followers_url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["username"], user1_data["username"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(
+            response.data["results"][0]["username"], user1_data["username"]
+        )
 
         # Check following of user1
         user1 = User.objects.get(email=user1_data["email"])
         following_url = reverse("following_list", args=[user1.id])
         response = self.client.get(following_url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["username"], user2_data["username"])
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(
+            response.data["results"][0]["username"], user2_data["username"]
+        )
 
         # Unfollow user2
         unfollow_url = reverse("unfollow_user", args=[user2.id])
@@ -106,7 +144,7 @@ class UserAuthTests(APITestCase):
         # Check followers of user2 again
         response = self.client.get(followers_url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data["results"]), 0)
 
 
 class UserProfileTests(APITestCase):
@@ -127,6 +165,16 @@ class UserProfileTests(APITestCase):
         self.assertEqual(self.user.first_name, "Updated")
         self.assertEqual(self.user.last_name, "User")
 
+    def test_update_does_not_write_counters(self):
+        url = reverse("profile_update")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.put(url, {"bio": "hello"}, format="json")
+        updates = [q["sql"] for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertTrue(updates)
+        for sql in updates:
+            self.assertNotIn("followers_count", sql)
+            self.assertNotIn("following_count", sql)
+
     def test_upload_avatar_and_variants(self):
         url = reverse("profile_upload_avatar")
         # Create a simple image in memory
@@ -187,25 +235,26 @@ class CoinClaimTests(APITestCase):
         self.claim_url = reverse("claim_daily_coins")
         self.history_url = reverse("coin_claim_history")
 
+    def balance(self):
+        return CoinWallet.objects.get(user=self.user).balance
+
     def test_claim_coin_and_balance_and_history(self):
         # Initial claim
         response = self.client.post(self.claim_url)
         self.assertEqual(response.status_code, 200)
-        self.user.refresh_from_db()
-        self.assertEqual(self.user.coins, 10)
+        self.assertEqual(self.balance(), 10)
         # History should have 1 entry
         response = self.client.get(self.history_url)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]["amount"], 10)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["amount"], 10)
         # Try to claim again the same day
         response = self.client.post(self.claim_url)
         self.assertEqual(response.status_code, 400)
-        self.user.refresh_from_db()
-        self.assertEqual(self.user.coins, 10)  # No change
+        self.assertEqual(self.balance(), 10)  # No change
         # History should still have 1 entry
         response = self.client.get(self.history_url)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
 
     def test_claim_next_day(self):
         from django.utils import timezone
@@ -213,20 +262,19 @@ class CoinClaimTests(APITestCase):
 
         # First claim
         self.client.post(self.claim_url)
-        self.user.refresh_from_db()
-        self.assertEqual(self.user.coins, 10)
+        self.assertEqual(self.balance(), 10)
         # Simulate next day
-        self.user.last_claimed = timezone.now().date() - datetime.timedelta(days=1)
-        self.user.save(update_fields=["last_claimed"])
+        CoinWallet.objects.filter(user=self.user).update(
+            last_claimed=timezone.now().date() - datetime.timedelta(days=1)
+        )
         response = self.client.post(self.claim_url)
-        self.user.refresh_from_db()
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(self.user.coins, 20)
+        self.assertEqual(self.balance(), 20)
         # History should have 2 entries
         response = self.client.get(self.history_url)
-        self.assertEqual(len(response.data), 2)
-        self.assertEqual(response.data[0]["amount"], 10)
-        self.assertEqual(response.data[1]["amount"], 10)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(response.data["results"][0]["amount"], 10)
+        self.assertEqual(response.data["results"][1]["amount"], 10)
 
     def test_cannot_claim_twice_in_one_day(self):
         # First claim should succeed
@@ -236,8 +284,838 @@ class CoinClaimTests(APITestCase):
         response = self.client.post(self.claim_url)
         self.assertEqual(response.status_code, 400)
         self.assertIn("already claimed", response.data["message"].lower())
-        self.user.refresh_from_db()
-        self.assertEqual(self.user.coins, 10)
+        self.assertEqual(self.balance(), 10)
         # History should only have 1 entry
         response = self.client.get(self.history_url)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_claim_touches_only_the_wallet(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.claim_url)
+        self.assertEqual(response.data["coins"], 10)
+        writes = [q["sql"] for q in ctx.captured_queries if "UPDATE" in q["sql"]]
+        self.assertFalse(any("users_customuser" in sql for sql in writes))
+        response = self.client.get(reverse("profile_me"))
+        self.assertEqual(response.data["coins"], 10)
+
+    def test_conditional_update_refuses_second_claim(self):
+        self.assertEqual(claim_daily_coins(self.user.pk), 10)
+        # A claim racing the first one sees the wallet already credited today.
+        self.assertIsNone(claim_daily_coins(self.user.pk))
+        self.assertEqual(self.balance(), 10)
+        self.assertEqual(CoinClaimHistory.objects.filter(user=self.user).count(), 1)
+
+
+class CoinHistoryAndSummaryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="coinsummary", password="pw")
+        self.client.force_authenticate(self.user)
+        today = timezone.now().date()
+        for days_ago in range(25):
+            claim = CoinClaimHistory.objects.create(user=self.user, amount=10)
+            add_to_rollups(self.user.pk, 10, today - timedelta(days=days_ago))
+            CoinClaimHistory.objects.filter(pk=claim.pk).update(
+                claimed_at=timezone.now() - timedelta(days=days_ago)
+            )
+        self.today = today
+
+    def test_history_is_keyset_paginated(self):
+        seen = []
+        url = reverse("coin_claim_history") + "?page_size=10"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen += [row["claimed_at"] for row in response.data["results"]]
+            url = response.data["next"]
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_summary_reads_rollups(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("coin_summary"), {"limit": 3})
+        self.assertEqual(
+            response.data["results"][0],
+            {"period_start": self.today.isoformat(), "total": 10, "claims": 1},
+        )
+        self.assertEqual(len(response.data["results"]), 3)
+
+        response = self.client.get(reverse("coin_summary"), {"period": "month"})
+        self.assertEqual(sum(row["total"] for row in response.data["results"]), 250)
+        response = self.client.get(reverse("coin_summary"), {"period": "week"})
+        self.assertEqual(sum(row["claims"] for row in response.data["results"]), 25)
+
+    def test_claim_updates_current_rollups(self):
+        def totals():
+            return {
+                period: CoinRollup.objects.get(
+                    user=self.user, period=period, period_start=start
+                ).total
+                for period, start in period_starts(self.today).items()
+            }
+
+        before = totals()
+        claim_daily_coins(self.user.pk)
+        self.assertEqual(
+            totals(), {period: total + 10 for period, total in before.items()}
+        )
+
+    def test_summary_rejects_unknown_period(self):
+        response = self.client.get(reverse("coin_summary"), {"period": "year"})
+        self.assertEqual(response.status_code, 400)
+
+
+class GcMediaCommandTests(APITestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = LocalMediaStorage(location=self.tmpdir.name)
+        self.user = User.objects.create_user(username="gcuser", password="pass1234")
+        self.kept = self.storage.save("avatars/kept.jpg", ContentFile(b"kept"))
+        self.orphan = self.storage.save("avatars/1/orphan.jpg", ContentFile(b"gone"))
+        User.objects.filter(pk=self.user.pk).update(
+            avatar=self.kept, avatar_sm=self.storage.url("avatars/1/avatar_sm.jpg")
+        )
+        self.variant = self.storage.save("avatars/1/avatar_sm.jpg", ContentFile(b"s"))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_gc(self, *args):
+        out = StringIO()
+        with mock.patch(
+            "users.management.commands.gc_media.get_media_storage",
+            return_value=self.storage,
+        ):
+            call_command("gc_media", *args, stdout=out)
+        return out.getvalue()
+
+    def test_dry_run_reports_without_deleting(self):
+        output = self.run_gc("--dry-run", "--grace-hours=0")
+        self.assertIn(self.orphan, output)
+        self.assertIn("Dry run: 1 orphaned files", output)
+        self.assertTrue(self.storage.exists(self.orphan))
+
+    def test_deletes_only_old_orphans(self):
+        self.run_gc()
+        self.assertTrue(self.storage.exists(self.orphan))
+        self.run_gc("--grace-hours=0")
+        self.assertFalse(self.storage.exists(self.orphan))
+        self.assertTrue(self.storage.exists(self.kept))
+        self.assertTrue(self.storage.exists(self.variant))
+
+
+class LatencyMediaStorageTests(APITestCase):
+    def make_image(self):
+        img_io = BytesIO()
+        Image.new("RGB", (300, 200), color=(10, 20, 30)).save(img_io, "JPEG")
+        img_io.seek(0)
+        return img_io
+
+    def test_generate_variants_records_calls(self):
+        storage = LatencyMediaStorage(latency={"save": 0.01}, jitter=0.005, seed=1)
+        variants = ImageVariantMixin().generate_variants(
+            self.make_image(), storage, "avatars/1/avatar"
+        )
+        self.assertEqual(set(variants), {"sm", "md", "lg"})
+        summary = storage.summary()
+        self.assertEqual(summary["save"]["count"], 3)
+        self.assertGreaterEqual(summary["save"]["mean"], 0.01)
+        self.assertTrue(storage.exists("avatars/1/avatar_sm.jpeg"))
+
+    def test_injected_failures(self):
+        storage = LatencyMediaStorage(failure_rate=1.0)
+        with self.assertRaises(InjectedStorageError):
+            storage.save("avatars/x.jpg", ContentFile(b"x"))
+        self.assertTrue(all(call.failed for call in storage.calls))
+
+
+class BenchMediaCommandTests(APITestCase):
+    def test_quick_run_writes_json(self):
+        with tempfile.NamedTemporaryFile(suffix=".json") as output:
+            call_command(
+                "bench_media",
+                "--quick",
+                "--repeat=1",
+                "--case=png_rgba_alpha",
+                f"--output={output.name}",
+                stdout=StringIO(),
+            )
+            results = json.load(output)
+        case = results["cases"]["png_rgba_alpha"]
+        self.assertEqual(case["mode"], "RGBA")
+        self.assertIn("write_ms", case["sm"])
+        self.assertIn("user_save_ms", case)
+        self.assertIn("process_peak_rss_kb", case)
+        self.assertIn("process_peak_rss_kb", results["meta"]["notes"])
+        self.assertFalse(User.objects.filter(username__startswith="bench_").exists())
+
+
+class FollowCountTests(APITestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="pass1234")
+        self.bob = User.objects.create_user(username="bob", password="pass1234")
+        self.carol = User.objects.create_user(username="carol", password="pass1234")
+        self.client.force_authenticate(user=self.alice)
+
+    def test_counts_follow_and_unfollow(self):
+        self.client.post(reverse("follow_user", args=[self.bob.id]))
+        self.client.post(reverse("follow_user", args=[self.bob.id]))
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.following_count, 1)
+        self.assertEqual(self.bob.followers_count, 1)
+        response = self.client.get(reverse("profile_me"))
+        self.assertEqual(response.data["following_count"], 1)
+
+        self.client.post(reverse("unfollow_user", args=[self.bob.id]))
+        self.client.post(reverse("unfollow_user", args=[self.bob.id]))
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual(self.alice.following_count, 0)
+        self.assertEqual(self.bob.followers_count, 0)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_is_followed_by_viewer_flag(self):
+        Follow.objects.create(follower=self.bob, following=self.carol)
+        Follow.objects.create(follower=self.alice, following=self.carol)
+        url = reverse("following_list", args=[self.bob.id])
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        # User cards are now cached: ETag validator, page and is_followed query.
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        results = response.data["results"]
+        self.assertEqual(results[0]["username"], "carol")
+        self.assertTrue(results[0]["is_followed_by_viewer"])
+        response = self.client.get(reverse("followers_list", args=[self.carol.id]))
+        flags = {
+            row["username"]: row["is_followed_by_viewer"]
+            for row in response.data["results"]
+        }
+        self.assertEqual(flags, {"bob": False, "alice": False})
+
+
+class FollowListPaginationTests(APITestCase):
+    def setUp(self):
+        self.star = User.objects.create_user(username="star", password="pass1234")
+        self.fans = [
+            User.objects.create_user(username=f"fan{i}", password="pass1234")
+            for i in range(5)
+        ]
+        for fan in self.fans:
+            Follow.objects.create(follower=fan, following=self.star)
+        Follow.objects.create(follower=self.star, following=self.fans[1])
+        Follow.objects.create(follower=self.star, following=self.fans[3])
+        self.client.force_authenticate(user=self.fans[0])
+
+    def test_cursor_walks_all_followers_newest_first(self):
+        url = reverse("followers_list", args=[self.star.id])
+        seen = []
+        response = self.client.get(url, {"page_size": 2})
+        while True:
+            seen += [row["username"] for row in response.data["results"]]
+            if not response.data["next"]:
+                break
+            response = self.client.get(response.data["next"])
+        self.assertEqual(seen, [f"fan{i}" for i in reversed(range(5))])
+
+    def test_invalid_cursor_and_unknown_user(self):
+        url = reverse("followers_list", args=[self.star.id])
+        response = self.client.get(url, {"cursor": "garbage"})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("followers_list", args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_mutuals(self):
+        response = self.client.get(reverse("mutuals_list", args=[self.star.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["username"] for row in response.data["results"]], ["fan3", "fan1"]
+        )
+
+
+class BulkFollowTests(APITestCase):
+    def setUp(self):
+        self.me = User.objects.create_user(username="importer", password="pass1234")
+        self.others = [
+            User.objects.create_user(username=f"contact{i}", password="pass1234")
+            for i in range(3)
+        ]
+        Follow.objects.create(follower=self.me, following=self.others[0])
+        User.objects.filter(pk=self.me.pk).update(following_count=1)
+        User.objects.filter(pk=self.others[0].pk).update(followers_count=1)
+        self.client.force_authenticate(user=self.me)
+
+    def test_bulk_follow_outcomes_and_counts(self):
+        ids = [o.id for o in self.others] + [self.me.id, 9999, self.others[1].id]
+        # Includes the SELECT ... FOR UPDATE of the follower row.
+        with self.assertNumQueries(8):
+            response = self.client.post(
+                reverse("bulk_follow"), {"user_ids": ids}, format="json"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["followed"], 2)
+        statuses = [row["status"] for row in response.data["results"]]
+        self.assertEqual(
+            statuses,
+            ["already_following", "followed", "followed", "self", "not_found"],
+        )
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.following_count, 3)
+        self.assertEqual(
+            [
+                u.followers_count
+                for u in User.objects.filter(username__startswith="contact").order_by(
+                    "username"
+                )
+            ],
+            [1, 1, 1],
+        )
+
+    def test_bulk_unfollow(self):
+        ids = [self.others[0].id, self.others[1].id]
+        response = self.client.post(
+            reverse("bulk_unfollow"), {"user_ids": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["status"] for row in response.data["results"]],
+            ["unfollowed", "not_following"],
+        )
+        self.me.refresh_from_db()
+        self.assertEqual(self.me.following_count, 0)
+
+    def test_bulk_follow_requires_ids(self):
+        response = self.client.post(
+            reverse("bulk_follow"), {"user_ids": []}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class FollowSuggestionTests(APITestCase):
+    def setUp(self):
+        names = ["me", "a", "b", "c", "d", "e"]
+        self.users = {
+            name: User.objects.create_user(username=name, password="pass1234")
+            for name in names
+        }
+        edges = [
+            ("me", "a"),
+            ("me", "b"),
+            ("a", "c"),
+            ("b", "c"),
+            ("a", "d"),
+            ("b", "me"),
+            ("e", "d"),
+        ]
+        for follower, following in edges:
+            Follow.objects.create(
+                follower=self.users[follower], following=self.users[following]
+            )
+        self.client.force_authenticate(user=self.users["me"])
+
+    def test_rebuild_and_serve(self):
+        out = StringIO()
+        call_command("build_follow_suggestions", "--top=5", stdout=out)
+        self.assertIn("Stored", out.getvalue())
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("follow_suggestions"))
+        self.assertEqual(
+            [(row["username"], row["mutual_count"]) for row in response.data],
+            [("c", 2), ("d", 1)],
+        )
+        Follow.objects.create(follower=self.users["me"], following=self.users["c"])
+        response = self.client.get(reverse("follow_suggestions"))
+        self.assertEqual([row["username"] for row in response.data], ["d"])
+
+
+@override_settings(SHARED_CACHE=True)
+class UserCardCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username="card_alice", password="pw")
+        self.bob = User.objects.create_user(username="card_bob", password="pw")
+
+    def test_get_many_and_invalidate_on_save(self):
+        with self.assertNumQueries(1):
+            cards = get_user_cards([self.alice.id, self.bob.id])
+        self.assertEqual(cards[self.bob.id]["username"], "card_bob")
+        with self.assertNumQueries(0):
+            get_user_cards([self.alice.id, self.bob.id])
+        self.alice.username = "card_alice2"
+        self.alice.save()
+        self.assertEqual(
+            get_user_cards([self.alice.id])[self.alice.id]["username"], "card_alice2"
+        )
+        self.alice.bio = "not on the card"
+        self.alice.save(update_fields=["bio"])
+        with self.assertNumQueries(0):
+            get_user_cards([self.alice.id])
+
+    @override_settings(SHARED_CACHE=False)
+    def test_cards_skip_per_process_cache(self):
+        get_user_cards([self.alice.id])
+        User.objects.filter(pk=self.alice.pk).update(username="card_elsewhere")
+        with self.assertNumQueries(1):
+            card = get_user_cards([self.alice.id])[self.alice.id]
+        self.assertEqual(card["username"], "card_elsewhere")
+
+    def test_card_read_during_avatar_save_is_not_kept(self):
+        generate_variants = User.generate_variants
+
+        def read_card_first(user, *args):
+            # A concurrent reader caches the card before the variants land.
+            get_user_cards([user.pk])
+            return generate_variants(user, *args)
+
+        img_io = BytesIO()
+        Image.new("RGB", (300, 300)).save(img_io, "JPEG")
+        self.alice.avatar = ContentFile(img_io.getvalue(), name="card.jpg")
+        with mock.patch.object(User, "generate_variants", read_card_first):
+            self.alice.save()
+        card = get_user_cards([self.alice.id])[self.alice.id]
+        self.assertEqual(card["avatar_sm"], self.alice.avatar_sm)
+        self.assertTrue(card["avatar_sm"])
+
+    def test_notification_list_uses_one_card_lookup(self):
+        for i in range(3):
+            Notification.objects.create(
+                recipient=self.alice,
+                sender=self.bob,
+                notification_type="like",
+                message=f"like {i}",
+            )
+        self.client.force_authenticate(user=self.alice)
+        # ETag aggregate, the page, and one card lookup for both users.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("notification-list"))
+        self.assertEqual(
+            {row["sender_username"] for row in response.data}, {"card_bob"}
+        )
+        self.assertEqual(response.data[0]["recipient_username"], "card_alice")
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="etag_me", password="pw")
+        self.other = User.objects.create_user(username="etag_other", password="pw")
+        self.client.force_authenticate(user=self.user)
+
+    def test_profile_me_etag(self):
+        url = reverse("profile_me")
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.user.bio = "changed"
+        self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_list_etag_changes_on_follow(self):
+        url = reverse("followers_list", args=[self.other.id])
+        etag = self.client.get(url)["ETag"]
+        # Counters, then the page with its users' card versions.
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.post(reverse("follow_user", args=[self.other.id]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+
+    def test_follow_list_etag_changes_when_listed_card_changes(self):
+        Follow.objects.create(follower=self.user, following=self.other)
+        url = reverse("followers_list", args=[self.other.id])
+        etag = self.client.get(url)["ETag"]
+        self.user.username = "etag_renamed"
+        self.user.save(update_fields=["username"])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["username"], "etag_renamed")
+
+    def test_follow_list_etag_ignores_unlisted_cards(self):
+        Follow.objects.create(follower=self.user, following=self.other)
+        url = reverse("followers_list", args=[self.other.id])
+        etag = self.client.get(url)["ETag"]
+        User.objects.create_user(username="etag_newcomer", password="pw")
+        self.other.first_name = "Owner"
+        self.other.save(update_fields=["first_name"])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class AuthThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.login_url = reverse("login")
+        User.objects.create_user(
+            username="throttled", email="throttled@example.com", password="pw"
+        )
+
+    def test_identifier_bucket_refuses_before_password_check(self):
+        payload = {"email_or_phone": "Throttled@example.com", "password": "wrong"}
+        for _ in range(5):
+            response = self.client.post(self.login_url, payload, format="json")
+            self.assertEqual(response.status_code, 400)
+        with mock.patch.object(User, "check_password") as check:
+            response = self.client.post(
+                self.login_url,
+                {"email_or_phone": "throttled@example.com ", "password": "wrong"},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        check.assert_not_called()
+
+        # Another account from the same IP still has its own bucket.
+        response = self.client.post(
+            self.login_url,
+            {"email_or_phone": "other@example.com", "password": "wrong"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_bucket_refills_over_time(self):
+        payload = {"email_or_phone": "throttled@example.com", "password": "pw"}
+        now = 1000.0
+        with mock.patch.object(LoginIdentifierThrottle, "timer", lambda self: now):
+            for _ in range(5):
+                self.client.post(self.login_url, payload, format="json")
+            response = self.client.post(self.login_url, payload, format="json")
+            self.assertEqual(response.status_code, 429)
+            now += 12  # 5/min refills one token every 12 seconds.
+            response = self.client.post(self.login_url, payload, format="json")
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post(self.login_url, payload, format="json")
+            self.assertEqual(response.status_code, 429)
+
+    def test_falls_back_to_local_buckets_when_cache_fails(self):
+        payload = {"email_or_phone": "throttled@example.com", "password": "wrong"}
+        broken = mock.Mock()
+        broken.get.side_effect = ConnectionError("cache down")
+        with (
+            mock.patch.object(LoginIdentifierThrottle, "cache", broken),
+            self.assertLogs("fido_web.throttling", "WARNING"),
+        ):
+            codes = [
+                self.client.post(self.login_url, payload, format="json").status_code
+                for _ in range(6)
+            ]
+        self.assertEqual(codes, [400] * 5 + [429])
+
+    def test_refuses_while_bucket_is_locked(self):
+        throttle = LoginIdentifierThrottle()
+        payload = {"email_or_phone": "throttled@example.com", "password": "pw"}
+        request = mock.Mock(data=payload)
+        cache.add(f"{throttle.get_cache_key(request, None)}_lock", 1)
+        response = self.client.post(self.login_url, payload, format="json")
+        self.assertEqual(response.status_code, 429)
+
+    def test_non_object_body_is_rejected_by_serializer(self):
+        for url in (self.login_url, reverse("register")):
+            response = self.client.post(url, [1, 2], format="json")
+            self.assertEqual(response.status_code, 400)
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="jwt_cache", password="pw", first_name="Jay"
+        )
+        invalidate_auth_user(self.user.pk)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+
+    def authenticate(self):
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {self.token}"
+        )
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_second_request_makes_no_auth_query(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(user.username, "jwt_cache")
+        # Other fields arrive together on first use and are never stale.
+        with self.assertNumQueries(1):
+            self.assertEqual(user.first_name, "Jay")
+            self.assertEqual(user.bio, None)
+            self.assertEqual(user.followers_count, 0)
+
+    def test_save_invalidates_cached_user(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_password_change_invalidates_cached_user(self):
+        self.authenticate()
+        self.user.set_password("new-password")
+        self.user.save(update_fields=["password"])
+        with self.assertNumQueries(1):
+            user = self.authenticate()
+        self.assertTrue(user.check_password("new-password"))
+
+    def test_deferred_user_saves_only_loaded_fields(self):
+        User.objects.filter(pk=self.user.pk).update(followers_count=25)
+        self.authenticate()
+        user = self.authenticate()
+        user.is_staff = True
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_staff)
+        self.assertEqual(self.user.followers_count, 25)
+
+    def test_avatar_upload_keeps_auth_changes_from_other_processes(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.client.get(reverse("profile_me"))
+        # Another process deactivates the user; this one still has it cached.
+        User.objects.filter(pk=self.user.pk).update(
+            is_active=False, password="changed-elsewhere", username="renamed"
+        )
+        img_io = BytesIO()
+        Image.new("RGB", (100, 100)).save(img_io, "JPEG")
+        response = self.client.post(
+            reverse("profile_upload_avatar"),
+            {"avatar": SimpleUploadedFile("a.jpg", img_io.getvalue())},
+            format="multipart",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.user.password, "changed-elsewhere")
+        self.assertEqual(self.user.username, "renamed")
+        self.assertTrue(self.user.avatar_sm)
+
+    def test_profile_endpoint_with_cached_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.client.get(reverse("profile_me"))
+        User.objects.filter(pk=self.user.pk).update(followers_count=40)
+        response = self.client.get(reverse("profile_me"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["followers_count"], 40)
+
+
+class SeedLoadCommandTests(APITestCase):
+    def seed(self, *extra):
+        call_command(
+            "seed_load",
+            "--users=40",
+            "--posts-per-user=2",
+            "--likes=200",
+            "--messages=60",
+            "--notifications=30",
+            "--tags=10",
+            "--batch-size=16",
+            "--seed=7",
+            *extra,
+            stdout=StringIO(),
+        )
+
+    def snapshot(self):
+        return (
+            list(
+                Follow.objects.order_by(
+                    "follower__username", "following__username"
+                ).values_list("follower__username", "following__username", "created_at")
+            ),
+            list(
+                Comment.objects.order_by("id").values_list(
+                    "user__username", "content", "parent__content"
+                )
+            ),
+        )
+
+    def test_generates_consistent_dataset(self):
+        self.seed()
+        users = User.objects.filter(username__startswith="load_")
+        self.assertEqual(users.count(), 40)
+        self.assertEqual(Post.objects.count(), 80)
+        self.assertEqual(Message.objects.count(), 60)
+        for conversation in Conversation.objects.all():
+            pair = Message.objects.filter(
+                sender__in=[conversation.user_low_id, conversation.user_high_id],
+                recipient__in=[conversation.user_low_id, conversation.user_high_id],
+            )
+            self.assertEqual(
+                conversation.last_message_id, pair.latest("created_at", "id").id
+            )
+            self.assertEqual(
+                conversation.unread_low,
+                pair.filter(recipient=conversation.user_low_id, is_read=False).count(),
+            )
+        self.assertEqual(Notification.objects.count(), 30)
+        self.assertTrue(0 < PostLike.objects.count() <= 200)
+        self.assertEqual(CoinWallet.objects.filter(user__in=users).count(), 40)
+        epoch = datetime.fromisoformat(DEFAULT_EPOCH)
+        for model in (Follow, Post, Comment, PostLike, Message, Notification):
+            self.assertFalse(model.objects.filter(created_at__gt=epoch).exists())
+        for user in users.annotate(
+            followers=Count("followers_set", distinct=True),
+            following=Count("following_set", distinct=True),
+        ):
+            self.assertEqual(user.followers_count, user.followers)
+            self.assertEqual(user.following_count, user.following)
+        for tag in Tag.objects.annotate(posts_count=Count("posts")):
+            self.assertEqual(tag.popularity, tag.posts_count)
+        for reply in Comment.objects.filter(parent__isnull=False).select_related(
+            "parent"
+        ):
+            self.assertEqual(reply.parent.post_id, reply.post_id)
+            self.assertGreaterEqual(reply.created_at, reply.parent.created_at)
+        replies = Notification.objects.filter(notification_type="reply")
+        self.assertTrue(replies.exists())
+        for notification in replies.select_related("comment__parent"):
+            self.assertEqual(notification.sender_id, notification.comment.user_id)
+            self.assertEqual(
+                notification.recipient_id, notification.comment.parent.user_id
+            )
+
+    def test_epoch_anchors_timestamps(self):
+        self.seed("--epoch=2030-06-01")
+        epoch = datetime.fromisoformat("2030-06-01T00:00:00+00:00")
+        newest = Post.objects.latest("created_at").created_at
+        self.assertLessEqual(newest, epoch)
+        self.assertGreater(newest, epoch - timedelta(days=365))
+
+    def test_same_seed_reproduces_dataset(self):
+        self.seed()
+        first = self.snapshot()
+        with self.assertRaises(CommandError):
+            self.seed()
+        self.seed("--flush")
+        self.assertEqual(self.snapshot(), first)
+
+
+class AvailabilityTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        # The filters are built here instead of on the maintenance thread.
+        start = mock.patch.object(taken_index, "start")
+        self.start = start.start()
+        self.addCleanup(start.stop)
+        taken_index.reset()
+        self.url = reverse("availability")
+        User.objects.create_user(
+            username="taken_name", email="taken@example.com", password="pw"
+        )
+        taken_index.rebuild()
+
+    def test_free_values_answer_without_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                self.url, {"username": "free_name", "email": "free@example.com"}
+            )
+        self.assertEqual(response.data, {"username": True, "email": True})
+
+    def test_taken_values_are_confirmed(self):
+        response = self.client.get(
+            self.url, {"username": "taken_name", "email": "taken@example.com"}
+        )
+        self.assertEqual(response.data, {"username": False, "email": False})
+
+    def test_lookups_before_first_build_query_the_table(self):
+        taken_index.reset()
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"username": "taken_name"})
+        self.assertEqual(response.data, {"username": False})
+        self.assertIsNone(taken_index.current)
+        self.start.assert_called()
+
+    def test_registration_updates_filter(self):
+        response = self.client.post(
+            reverse("register"),
+            {
+                "username": "fresh_user",
+                "email": "fresh@example.com",
+                "full_name": "Fresh User",
+                "phone_number": "0811111111",
+                "password": "TestPassword123!",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"username": "fresh_user"})
+        self.assertEqual(response.data, {"username": False})
+
+    def test_users_from_other_processes_are_caught_up(self):
+        User.objects.create_user(username="elsewhere", password="pw")
+        taken_index.maintain()
+        response = self.client.get(self.url, {"username": "elsewhere"})
+        self.assertEqual(response.data, {"username": False})
+
+    def test_rebuild_swaps_in_new_filters(self):
+        old = taken_index.current
+        User.objects.filter(username="taken_name").update(username="renamed")
+        taken_index.rebuild()
+        self.assertIsNot(taken_index.current, old)
+        self.assertNotIn("taken_name", taken_index.current.filters["username"])
+        self.assertIn("taken_name", old.filters["username"])
+
+    def test_invalid_input(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        response = self.client.get(self.url, {"username": "has space"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        values = [f"user_{i}" for i in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        false_positives = sum(f"other_{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class UserSearchTests(APITestCase):
+    def setUp(self):
+        self.viewer = User.objects.create_user(username="searcher", password="pw")
+        self.client.force_authenticate(self.viewer)
+        for username, first, last, followers in [
+            ("andi_p", "Andi", "Pratama", 5),
+            ("budi", "Ándrea", "Santoso", 50),
+            ("andika", "Dika", "", 20),
+            ("citra", "Citra", "Andini", 100),
+        ]:
+            user = User.objects.create_user(
+                username=username, first_name=first, last_name=last, password="pw"
+            )
+            User.objects.filter(pk=user.pk).update(followers_count=followers)
+        self.url = reverse("user_search")
+
+    def test_prefix_match_ranked_by_followers(self):
+        response = self.client.get(self.url, {"q": "AND"})
+        self.assertEqual(response.status_code, 200)
+        # Username or full-name prefix, accents ignored; "Andini" is a last
+        # name, not a prefix of the full name.
+        self.assertEqual(
+            [user["username"] for user in response.data], ["budi", "andika", "andi_p"]
+        )
+        self.assertFalse(response.data[0]["is_followed_by_viewer"])
+
+    def test_mention_autocomplete_and_limit(self):
+        Follow.objects.create(
+            follower=self.viewer, following=User.objects.get(username="andika")
+        )
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"q": "@andi", "limit": 1})
+        self.assertEqual(response.data[0]["username"], "andika")
+        self.assertTrue(response.data[0]["is_followed_by_viewer"])
+
+    def test_short_prefix_walks_follower_index(self):
+        response = self.client.get(self.url, {"q": "a"})
+        self.assertEqual(
+            [user["username"] for user in response.data], ["budi", "andika", "andi_p"]
+        )
+        self.assertIn("user_followers_idx", search.search_users("a", 10).explain())
+
+    def test_search_fields_follow_renames(self):
+        user = User.objects.get(username="citra")
+        user.first_name = "Zahra"
+        user.save(update_fields=["first_name"])
+        response = self.client.get(self.url, {"q": "zah"})
+        self.assertEqual([user["username"] for user in response.data], ["citra"])
+        self.assertEqual(self.client.get(self.url, {"q": ""}).data, [])
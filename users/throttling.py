@@ -0,0 +1,52 @@
+import hashlib
+from collections.abc import Mapping
+
+from fido_web.throttling import TokenBucketThrottle
+
+
+class IdentifierThrottle(TokenBucketThrottle):
+    """Bucket per submitted account identifier, whichever IP it comes from."""
+
+    identifier_fields = ()
+
+    def get_cache_key(self, request, view):
+        if not isinstance(request.data, Mapping):
+            # Not an object; the serializer rejects it without a bucket.
+            return None
+        for field in self.identifier_fields:
+            value = request.data.get(field)
+            if isinstance(value, str) and value.strip():
+                # Hashed so arbitrary user input is always a valid cache key.
+                ident = hashlib.sha256(value.strip().lower().encode()).hexdigest()
+                return self.cache_format % {"scope": self.scope, "ident": ident}
+        return None
+
+
+class IPThrottle(TokenBucketThrottle):
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = "login_ip"
+
+
+class LoginIdentifierThrottle(IdentifierThrottle):
+    scope = "login_identifier"
+    identifier_fields = ("email_or_phone",)
+
+
+class RegisterIPThrottle(IPThrottle):
+    scope = "register_ip"
+
+
+class RegisterIdentifierThrottle(IdentifierThrottle):
+    scope = "register_identifier"
+    identifier_fields = ("email", "phone_number", "username")
+
+
+class AvailabilityIPThrottle(IPThrottle):
+    scope = "availability_ip"
@@ -2,29 +2,44 @@ from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from .views import (
+    AvailabilityView,
+    BulkFollowUserView,
+    BulkUnfollowUserView,
     CoinClaimHistoryListView,
+    CoinSummaryView,
     DailyCoinClaimView,
     FollowersListView,
     FollowingListView,
+    FollowSuggestionsView,
     FollowUserView,
     LoginByEmailOrPhoneView,
+    MutualFollowsListView,
+    PresenceView,
     ProfileMeView,
     ProfilePictureUploadView,
     ProfileUpdateView,
     RegisterView,
     UnfollowUserView,
+    UserSearchView,
 )
 
 urlpatterns = [
     path("register/", RegisterView.as_view(), name="register"),
+    path("availability/", AvailabilityView.as_view(), name="availability"),
+    path("search/", UserSearchView.as_view(), name="user_search"),
+    path("presence/", PresenceView.as_view(), name="presence"),
     path("profile/me/", ProfileMeView.as_view(), name="profile_me"),
     path("profile/update/", ProfileUpdateView.as_view(), name="profile_update"),
     path("login/", LoginByEmailOrPhoneView.as_view(), name="login"),
     path("refresh/", TokenRefreshView.as_view(), name="jwt_refresh"),
     path("follow/<int:user_id>/", FollowUserView.as_view(), name="follow_user"),
+    path("follow/bulk/", BulkFollowUserView.as_view(), name="bulk_follow"),
+    path("unfollow/bulk/", BulkUnfollowUserView.as_view(), name="bulk_unfollow"),
     path("unfollow/<int:user_id>/", UnfollowUserView.as_view(), name="unfollow_user"),
     path("followers/<int:user_id>/", FollowersListView.as_view(), name="followers_list"),
     path("following/<int:user_id>/", FollowingListView.as_view(), name="following_list"),
+    path("suggestions/", FollowSuggestionsView.as_view(), name="follow_suggestions"),
+    path("mutuals/<int:user_id>/", MutualFollowsListView.as_view(), name="mutuals_list"),
     path(
         "profile/upload-avatar/",
         ProfilePictureUploadView.as_view(),
@@ -36,4 +51,5 @@ urlpatterns = [
         CoinClaimHistoryListView.as_view(),
         name="coin_claim_history",
     ),
+    path("coin-summary/", CoinSummaryView.as_view(), name="coin_summary"),
 ]
@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery
 from rest_framework import generics, status
 from rest_framework.generics import GenericAPIView
 from rest_framework.parsers import FormParser, MultiPartParser
@@ -6,19 +8,170 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.utils import timezone
-from drf_spectacular.utils import extend_schema, OpenApiExample, OpenApiResponse
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiExample,
+    OpenApiParameter,
+    OpenApiResponse,
+)
+
+from fido_web.conditional import conditional_get
+from fido_web.pagination import KeysetPagination
+from fido_web.presence import online_user_ids
+from messages.conversations import conversation_partners
 
-from .models import Follow, CoinClaimHistory
+from .availability import taken_index
+from .cards import get_user_cards
+from .coins import DAILY_CLAIM_AMOUNT, claim_daily_coins, get_balance
+from .models import Follow, FollowSuggestion, CoinClaimHistory, CoinRollup
+from .search import search_users
+from .throttling import (
+    AvailabilityIPThrottle,
+    LoginIdentifierThrottle,
+    LoginIPThrottle,
+    RegisterIdentifierThrottle,
+    RegisterIPThrottle,
+)
 from .serializers import (
+    AvailabilitySerializer,
+    BulkFollowSerializer,
+    CoinClaimHistorySerializer,
+    CoinRollupSerializer,
+    FollowSuggestionSerializer,
     LoginByEmailOrPhoneSerializer,
     ProfilePictureSerializer,
     RegisterSerializer,
     UserListSerializer,
+    UserSearchSerializer,
 )
 
 User = get_user_model()
 
+PRESENCE_MAX_IDS = 100
+
+
+KEYSET_PAGE_PARAMETERS = [
+    OpenApiParameter("cursor", str, description="Cursor from the previous page."),
+    OpenApiParameter("page_size", int, description="Results per page (max 100)."),
+]
+
+
+def lock_follower(user):
+    """
+    Lock ``user``'s row for the rest of the transaction. Views that create
+    Follow rows take it first, so the ones they count cannot be inserted
+    concurrently by another request of the same follower.
+    """
+    list(User.objects.select_for_update().filter(pk=user.pk).values_list("pk"))
+
+
+def followed_by_viewer(viewer, user_ids):
+    """Return the subset of ``user_ids`` the viewer follows, in one query."""
+    return set(
+        Follow.objects.filter(
+            follower=viewer, following_id__in=user_ids
+        ).values_list("following_id", flat=True)
+    )
+
+
+def profile_validator(view, request):
+    user = request.user
+    # Read once here and reused by ProfileMeView.get().
+    view.coins = get_balance(user.pk)
+    return (
+        user.username,
+        user.email,
+        user.first_name,
+        user.last_name,
+        user.bio,
+        user.avatar.name,
+        user.phone_number,
+        view.coins,
+        user.followers_count,
+        user.following_count,
+    )
+
+
+def follow_list_validator(view, request, user_id):
+    """
+    Counters plus newest follow in each direction, for the user and viewer,
+    and the ``card_version`` of every user on the requested page.
+    """
+
+    def newest(field):
+        return Subquery(
+            Follow.objects.filter(**{field: OuterRef("pk")})
+            .order_by("-created_at")
+            .values("created_at")[:1]
+        )
+
+    follows = list(
+        User.objects.filter(id__in=[user_id, request.user.id])
+        .annotate(
+            newest_follower=newest("following_id"),
+            newest_following=newest("follower_id"),
+        )
+        .order_by("id")
+        .values_list(
+            "id",
+            "followers_count",
+            "following_count",
+            "newest_follower",
+            "newest_following",
+        )
+    )
+    cards = [
+        (getattr(follow, f"{view.related}_id"), follow.card_version)
+        for follow in view.get_page(request, user_id)
+    ]
+    return follows, cards
+
+
+class FollowListView(APIView):
+    """
+    One keyset page of ``get_follows(user_id)``, showing the ``related`` side.
+
+    The page is read once per request, by the ETag validator or by ``get``,
+    whichever runs first.
+    """
+
+    permission_classes = [IsAuthenticated]
+    related = "following"
+    paginator = None
+    page = None
+
+    def get_follows(self, user_id):
+        raise NotImplementedError
+
+    def get_page(self, request, user_id):
+        if self.page is None:
+            self.paginator = KeysetPagination()
+            self.page = self.paginator.paginate_queryset(
+                self.get_follows(user_id)
+                .only("id", "created_at", f"{self.related}_id")
+                .annotate(card_version=F(f"{self.related}__card_version")),
+                request,
+            )
+        return self.page
+
+    @conditional_get(follow_list_validator)
+    def get(self, request, user_id):
+        page = self.get_page(request, user_id)
+        if not page and not request.query_params.get(self.paginator.cursor_query_param):
+            if not User.objects.filter(id=user_id).exists():
+                return Response({"message": "User not found."}, status=404)
+        user_ids = [getattr(follow, f"{self.related}_id") for follow in page]
+        cards = get_user_cards(user_ids)
+        followed = followed_by_viewer(request.user, user_ids)
+        data = [
+            {**cards[user_id], "is_followed_by_viewer": user_id in followed}
+            for user_id in user_ids
+            if user_id in cards
+        ]
+        return self.paginator.get_paginated_response(
+            UserListSerializer(data, many=True).data
+        )
+
 
 @extend_schema(
     request=RegisterSerializer,
@@ -65,6 +218,7 @@ User = get_user_model()
 class RegisterView(generics.CreateAPIView):
     serializer_class = RegisterSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [RegisterIPThrottle, RegisterIdentifierThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -75,6 +229,40 @@ class RegisterView(generics.CreateAPIView):
         )
 
 
+class AvailabilityView(APIView):
+    permission_classes = [AllowAny]
+    throttle_classes = [AvailabilityIPThrottle]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("username", str, description="Username to check."),
+            OpenApiParameter("email", str, description="Email address to check."),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description='Availability of each value that was passed',
+                examples=[
+                    OpenApiExample(
+                        name='Availability Response',
+                        value={"username": True, "email": False},
+                        status_codes=['200']
+                    ),
+                ]
+            ),
+        }
+    )
+    def get(self, request):
+        serializer = AvailabilitySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        # Answered from the in-memory Bloom filters; only possible hits query.
+        return Response(
+            {
+                field: not taken_index.is_taken(field, value)
+                for field, value in serializer.validated_data.items()
+            }
+        )
+
+
 class ProfileMeView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -94,7 +282,9 @@ class ProfileMeView(APIView):
                             "bio": "Software developer with passion for building amazing products",
                             "avatar": "/media/avatars/1/avatar.jpg",
                             "phone_number": "+1234567890",
-                            "coins": 50
+                            "coins": 50,
+                            "followers_count": 120,
+                            "following_count": 80
                         },
                         status_codes=['200']
                     ),
@@ -102,6 +292,7 @@ class ProfileMeView(APIView):
             ),
         }
     )
+    @conditional_get(profile_validator)
     def get(self, request):
         user = request.user
         data = {
@@ -113,7 +304,9 @@ class ProfileMeView(APIView):
             "bio": user.bio,
             "avatar": user.avatar.url if user.avatar else None,
             "phone_number": user.phone_number,
-            "coins": user.coins,
+            "coins": self.coins,
+            "followers_count": user.followers_count,
+            "following_count": user.following_count,
         }
         return Response(data)
 
@@ -164,14 +357,18 @@ class ProfileUpdateView(APIView):
         user.last_name = data.get("last_name", user.last_name)
         user.bio = data.get("bio", user.bio)
         user.phone_number = data.get("phone_number", user.phone_number)
+        # Only the edited columns: a full save would write back stale counters.
+        update_fields = ["first_name", "last_name", "bio", "phone_number"]
         if "avatar" in data:
             user.avatar = data["avatar"]
-        user.save()
+            update_fields.append("avatar")
+        user.save(update_fields=update_fields)
         return Response({"message": "Profile updated successfully"})
 
 
 class LoginByEmailOrPhoneView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [LoginIPThrottle, LoginIdentifierThrottle]
 
     @extend_schema(
         request=LoginByEmailOrPhoneSerializer,
@@ -282,9 +479,18 @@ class FollowUserView(APIView):
             return Response({"message": "User not found."}, status=404)
         if to_follow == request.user:
             return Response({"message": "You cannot follow yourself."}, status=400)
-        follow, created = Follow.objects.get_or_create(
-            follower=request.user, following=to_follow
-        )
+        with transaction.atomic():
+            lock_follower(request.user)
+            follow, created = Follow.objects.get_or_create(
+                follower=request.user, following=to_follow
+            )
+            if created:
+                User.objects.filter(pk=request.user.pk).update(
+                    following_count=F("following_count") + 1
+                )
+                User.objects.filter(pk=to_follow.pk).update(
+                    followers_count=F("followers_count") + 1
+                )
         if not created:
             return Response({"message": "Already following."}, status=400)
         return Response({"message": f"Now following {to_follow.username}."}, status=201)
@@ -332,9 +538,17 @@ class UnfollowUserView(APIView):
             to_unfollow = User.objects.get(id=user_id)
         except User.DoesNotExist:
             return Response({"message": "User not found."}, status=404)
-        deleted, _ = Follow.objects.filter(
-            follower=request.user, following=to_unfollow
-        ).delete()
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(
+                follower=request.user, following=to_unfollow
+            ).delete()
+            if deleted:
+                User.objects.filter(pk=request.user.pk).update(
+                    following_count=F("following_count") - 1
+                )
+                User.objects.filter(pk=to_unfollow.pk).update(
+                    followers_count=F("followers_count") - 1
+                )
         if deleted:
             return Response(
                 {"message": f"Unfollowed {to_unfollow.username}."}, status=200
@@ -342,84 +556,385 @@ class UnfollowUserView(APIView):
         return Response({"message": "You are not following this user."}, status=400)
 
 
-class FollowersListView(APIView):
+BULK_FOLLOW_EXAMPLE = OpenApiExample(
+    name="Bulk Follow Example",
+    value={"user_ids": [2, 3, 4]},
+    request_only=True,
+)
+
+
+class BulkFollowUserView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=BulkFollowSerializer,
+        responses={
+            200: OpenApiResponse(
+                description="Per-user outcome",
+                examples=[
+                    OpenApiExample(
+                        name="Success Response",
+                        value={
+                            "followed": 1,
+                            "results": [
+                                {"user_id": 2, "status": "followed"},
+                                {"user_id": 3, "status": "already_following"},
+                                {"user_id": 4, "status": "not_found"},
+                            ],
+                        },
+                        status_codes=["200"],
+                    ),
+                ],
+            ),
+        },
+        examples=[BULK_FOLLOW_EXAMPLE],
+    )
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = list(dict.fromkeys(serializer.validated_data["user_ids"]))
+        found = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+        with transaction.atomic():
+            # With the lock held no other request can add this user's follows,
+            # so every row in to_follow is really inserted and counted once.
+            lock_follower(request.user)
+            already = followed_by_viewer(request.user, found)
+            to_follow = found - already - {request.user.id}
+            Follow.objects.bulk_create(
+                [
+                    Follow(follower=request.user, following_id=user_id)
+                    for user_id in to_follow
+                ],
+                ignore_conflicts=True,
+            )
+            if to_follow:
+                User.objects.filter(pk=request.user.pk).update(
+                    following_count=F("following_count") + len(to_follow)
+                )
+                User.objects.filter(id__in=to_follow).update(
+                    followers_count=F("followers_count") + 1
+                )
+
+        def outcome(user_id):
+            if user_id not in found:
+                return "not_found"
+            if user_id == request.user.id:
+                return "self"
+            if user_id in already:
+                return "already_following"
+            return "followed"
+
+        return Response(
+            {
+                "followed": len(to_follow),
+                "results": [
+                    {"user_id": user_id, "status": outcome(user_id)}
+                    for user_id in user_ids
+                ],
+            }
+        )
+
+
+class BulkUnfollowUserView(APIView):
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
+        request=BulkFollowSerializer,
+        responses={
+            200: OpenApiResponse(
+                description="Per-user outcome",
+                examples=[
+                    OpenApiExample(
+                        name="Success Response",
+                        value={
+                            "unfollowed": 1,
+                            "results": [
+                                {"user_id": 2, "status": "unfollowed"},
+                                {"user_id": 3, "status": "not_following"},
+                            ],
+                        },
+                        status_codes=["200"],
+                    ),
+                ],
+            ),
+        },
+        examples=[BULK_FOLLOW_EXAMPLE],
+    )
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user_ids = list(dict.fromkeys(serializer.validated_data["user_ids"]))
+        with transaction.atomic():
+            follows = Follow.objects.select_for_update().filter(
+                follower=request.user, following_id__in=user_ids
+            )
+            unfollowed = set(follows.values_list("following_id", flat=True))
+            if unfollowed:
+                Follow.objects.filter(
+                    follower=request.user, following_id__in=unfollowed
+                ).delete()
+                User.objects.filter(pk=request.user.pk).update(
+                    following_count=F("following_count") - len(unfollowed)
+                )
+                User.objects.filter(id__in=unfollowed).update(
+                    followers_count=F("followers_count") - 1
+                )
+        return Response(
+            {
+                "unfollowed": len(unfollowed),
+                "results": [
+                    {
+                        "user_id": user_id,
+                        "status": (
+                            "unfollowed" if user_id in unfollowed else "not_following"
+                        ),
+                    }
+                    for user_id in user_ids
+                ],
+            }
+        )
+
+
+class FollowersListView(FollowListView):
+    related = "follower"
+
+    def get_follows(self, user_id):
+        return Follow.objects.filter(following_id=user_id)
+
+    @extend_schema(
+        parameters=KEYSET_PAGE_PARAMETERS,
         responses={
             200: UserListSerializer(many=True),
         },
         examples=[
             OpenApiExample(
                 name='Followers List',
-                value=[
-                    {
-                        "id": 1,
-                        "username": "user1"
-                    },
-                    {
-                        "id": 2,
-                        "username": "user2"
-                    }
-                ],
+                value={
+                    "next": "http://localhost:8000/api/users/followers/5/?cursor=MjAyNS0wNi0wNVQxNTowMDowMCswMDowMHw0Mg%3D%3D",
+                    "results": [
+                        {
+                            "id": 1,
+                            "username": "user1",
+                            "is_followed_by_viewer": True
+                        },
+                        {
+                            "id": 2,
+                            "username": "user2",
+                            "is_followed_by_viewer": False
+                        }
+                    ]
+                },
                 response_only=True
             ),
         ]
     )
     def get(self, request, user_id):
-        try:
-            user = User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return Response({"message": "User not found."}, status=404)
+        return super().get(request, user_id)
 
-        followers = Follow.objects.filter(following=user).select_related(
-            "follower"
-        )
-        data = [
-            {"id": f.follower.id, "username": f.follower.username} for f in followers
-        ]
-        serializer = UserListSerializer(data, many=True)
-        return Response(serializer.data)
 
+class FollowingListView(FollowListView):
+    related = "following"
 
-class FollowingListView(APIView):
-    permission_classes = [IsAuthenticated]
+    def get_follows(self, user_id):
+        return Follow.objects.filter(follower_id=user_id)
 
     @extend_schema(
+        parameters=KEYSET_PAGE_PARAMETERS,
         responses={
             200: UserListSerializer(many=True),
         },
         examples=[
             OpenApiExample(
                 name='Following List',
-                value=[
-                    {
-                        "id": 3,
-                        "username": "user3"
-                    },
-                    {
-                        "id": 4,
-                        "username": "user4"
-                    }
-                ],
+                value={
+                    "next": "http://localhost:8000/api/users/following/5/?cursor=MjAyNS0wNi0wNVQxNTowMDowMCswMDowMHw0Mg%3D%3D",
+                    "results": [
+                        {
+                            "id": 3,
+                            "username": "user3",
+                            "is_followed_by_viewer": True
+                        },
+                        {
+                            "id": 4,
+                            "username": "user4",
+                            "is_followed_by_viewer": False
+                        }
+                    ]
+                },
                 response_only=True
             ),
         ]
     )
     def get(self, request, user_id):
+        return super().get(request, user_id)
+
+
+class MutualFollowsListView(FollowListView):
+    related = "following"
+
+    def get_follows(self, user_id):
+        # Users that user_id follows and who follow user_id back, resolved by
+        # joining Follow to itself on the (follower, following) unique index.
+        return Follow.objects.filter(
+            follower_id=user_id, following__following_set__following_id=user_id
+        )
+
+    @extend_schema(
+        parameters=KEYSET_PAGE_PARAMETERS,
+        responses={
+            200: UserListSerializer(many=True),
+        },
+    )
+    def get(self, request, user_id):
+        return super().get(request, user_id)
+
+
+class FollowSuggestionsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter("limit", int, description="Maximum results (max 50)."),
+        ],
+        responses={
+            200: FollowSuggestionSerializer(many=True),
+        },
+        examples=[
+            OpenApiExample(
+                name="Suggestions",
+                value=[
+                    {"id": 7, "username": "user7", "mutual_count": 5},
+                    {"id": 9, "username": "user9", "mutual_count": 2},
+                ],
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request):
         try:
-            user = User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return Response({"message": "User not found."}, status=404)
+            limit = max(1, min(int(request.query_params.get("limit", 20)), 50))
+        except ValueError:
+            limit = 20
+        # Snapshot rows are refreshed periodically by build_follow_suggestions;
+        # accounts followed since then are filtered out in the same query.
+        suggestions = (
+            FollowSuggestion.objects.filter(user=request.user)
+            .exclude(
+                Exists(
+                    Follow.objects.filter(
+                        follower=request.user, following_id=OuterRef("suggested_id")
+                    )
+                )
+            )
+            .select_related("suggested")
+            .only("suggested_id", "suggested__username", "mutual_count")
+            .order_by("rank")[:limit]
+        )
+        return Response(FollowSuggestionSerializer(suggestions, many=True).data)
+
+
+class UserSearchView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        following = Follow.objects.filter(follower=user).select_related(
-            "following"
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "q",
+                str,
+                required=True,
+                description="Username or full name prefix; a leading @ is ignored.",
+            ),
+            OpenApiParameter("limit", int, description="Max results (default 10, max 50)."),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description='Matching users, most followed first',
+                examples=[
+                    OpenApiExample(
+                        name='Search Response',
+                        value=[
+                            {
+                                "id": 3,
+                                "username": "johndoe",
+                                "first_name": "John",
+                                "last_name": "Doe",
+                                "avatar_sm": "/media/avatars/3/avatar_sm.jpg",
+                                "followers_count": 120,
+                                "is_followed_by_viewer": False
+                            }
+                        ],
+                        status_codes=['200']
+                    ),
+                ]
+            ),
+        }
+    )
+    def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 10)), 50))
+        except ValueError:
+            limit = 10
+        users = list(search_users(request.query_params.get("q", ""), limit))
+        followed = followed_by_viewer(request.user, [user["id"] for user in users])
+        for user in users:
+            user["is_followed_by_viewer"] = user["id"] in followed
+        return Response(UserSearchSerializer(users, many=True).data)
+
+
+class PresenceView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "ids",
+                str,
+                required=True,
+                description=(
+                    "Comma-separated user ids (max 100). Users the caller "
+                    "neither follows nor has a conversation with are never "
+                    "reported online."
+                ),
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description='The requested users that have a realtime socket open',
+                examples=[
+                    OpenApiExample(
+                        name='Presence Response',
+                        value={"online": [3, 7]},
+                        status_codes=['200']
+                    ),
+                ]
+            ),
+            400: OpenApiResponse(description='Invalid or too many ids'),
+        }
+    )
+    def get(self, request):
+        try:
+            user_ids = {
+                int(user_id)
+                for user_id in request.query_params.get("ids", "").split(",")
+                if user_id.strip()
+            }
+        except ValueError:
+            return Response(
+                {"message": "ids must be comma-separated integers."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(user_ids) > PRESENCE_MAX_IDS:
+            return Response(
+                {"message": f"At most {PRESENCE_MAX_IDS} ids per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        # Only the caller, people they follow and people they talk to.
+        visible = user_ids & (
+            {request.user.id}
+            | followed_by_viewer(request.user, user_ids)
+            | conversation_partners(request.user.id, user_ids)
         )
-        data = [
-            {"id": f.following.id, "username": f.following.username} for f in following
-        ]
-        serializer = UserListSerializer(data, many=True)
-        return Response(serializer.data)
+        return Response({"online": sorted(online_user_ids(visible))})
 
 
 class ProfilePictureUploadView(GenericAPIView):
@@ -524,19 +1039,14 @@ class DailyCoinClaimView(APIView):
         }
     )
     def post(self, request):
-        user = request.user
-        today = timezone.now().date()
-        if user.last_claimed == today:
+        balance = claim_daily_coins(request.user.pk, DAILY_CLAIM_AMOUNT)
+        if balance is None:
             return Response(
                 {"message": "You have already claimed your daily coins."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        user.coins += 10
-        user.last_claimed = today
-        user.save(update_fields=["coins", "last_claimed"])
-        CoinClaimHistory.objects.create(user=user, amount=10)
         return Response(
-            {"message": "10 coins claimed!", "coins": user.coins},
+            {"message": f"{DAILY_CLAIM_AMOUNT} coins claimed!", "coins": balance},
             status=status.HTTP_200_OK,
         )
 
@@ -545,24 +1055,28 @@ class CoinClaimHistoryListView(APIView):
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
+        parameters=KEYSET_PAGE_PARAMETERS,
         responses={
             200: OpenApiResponse(
-                description='Coin claim history',
+                description='Coin claim history, newest first',
                 examples=[
                     OpenApiExample(
                         name='Claim History Response',
-                        value=[
-                            {
-                                "id": 1,
-                                "claimed_at": "2025-06-05T15:24:30Z",
-                                "amount": 10
-                            },
-                            {
-                                "id": 2,
-                                "claimed_at": "2025-06-04T12:18:45Z",
-                                "amount": 10
-                            }
-                        ],
+                        value={
+                            "next": "http://localhost:8000/api/users/coin-claim-history/?cursor=MjAyNS0wNi0wNFQxMjoxODo0NSswMDowMHwy",
+                            "results": [
+                                {
+                                    "id": 1,
+                                    "claimed_at": "2025-06-05T15:24:30Z",
+                                    "amount": 10
+                                },
+                                {
+                                    "id": 2,
+                                    "claimed_at": "2025-06-04T12:18:45Z",
+                                    "amount": 10
+                                }
+                            ]
+                        },
                         status_codes=['200']
                     ),
                 ]
@@ -570,8 +1084,80 @@ class CoinClaimHistoryListView(APIView):
         }
     )
     def get(self, request):
-        claims = CoinClaimHistory.objects.filter(user=request.user)
-        from .serializers import CoinClaimHistorySerializer
+        paginator = KeysetPagination(ordering_field="claimed_at")
+        page = paginator.paginate_queryset(
+            CoinClaimHistory.objects.filter(user_id=request.user.pk), request
+        )
+        serializer = CoinClaimHistorySerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
-        serializer = CoinClaimHistorySerializer(claims, many=True)
-        return Response(serializer.data)
+
+class CoinSummaryView(APIView):
+    permission_classes = [IsAuthenticated]
+    default_limit = 30
+    max_limit = 366
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "period",
+                str,
+                enum=[CoinRollup.DAY, CoinRollup.WEEK, CoinRollup.MONTH],
+                description="Rollup granularity (default: day).",
+            ),
+            OpenApiParameter(
+                "limit", int, description="Most recent periods to return (max 366)."
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                description='Coin totals per period, newest first',
+                examples=[
+                    OpenApiExample(
+                        name='Weekly Summary',
+                        value={
+                            "period": "week",
+                            "results": [
+                                {"period_start": "2025-06-02", "total": 40, "claims": 4},
+                                {"period_start": "2025-05-26", "total": 70, "claims": 7}
+                            ]
+                        },
+                        status_codes=['200']
+                    ),
+                ]
+            ),
+            400: OpenApiResponse(
+                description='Unknown period',
+                examples=[
+                    OpenApiExample(
+                        name='Invalid Period',
+                        value={"message": "period must be one of: day, week, month."},
+                        status_codes=['400']
+                    ),
+                ]
+            ),
+        }
+    )
+    def get(self, request):
+        periods = [value for value, _ in CoinRollup.PERIODS]
+        period = request.query_params.get("period", CoinRollup.DAY)
+        if period not in periods:
+            return Response(
+                {"message": f"period must be one of: {', '.join(periods)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = max(1, min(limit, self.max_limit))
+        # Rows are maintained on every claim, so this is one index range scan.
+        rollups = CoinRollup.objects.filter(
+            user_id=request.user.pk, period=period
+        ).order_by("-period_start")[:limit]
+        return Response(
+            {
+                "period": period,
+                "results": CoinRollupSerializer(rollups, many=True).data,
+            }
+        )